@@ -1,9 +1,12 @@
+import asyncio
+import contextlib
+import copy
 import os
 import re
 import html
 import gradio as gr
 
-from fonctions.config import TOP_K
+from fonctions.config import TOP_K, APP_CONCURRENCY
 from fonctions.rag_pipeline import RAGPipeline
 
 os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
@@ -82,40 +85,80 @@ def build_sources_md(hits, display_mode: str = "Détaillé", clean: bool = True)
             )
     return "\n\n".join(lines)
 
-def submit_message(user_msg, chat_messages, top_k, display_mode, clean_extracts):
+_STAGES = [("embed_ms", "embedding"), ("tables_ms", "tableaux"), ("general_ms", "MMR"), ("bm25_ms", "BM25"),
+           ("kpi_ms", "KPI"), ("cache_ms", "cache"), ("first_token_ms", "1er token"), ("llm_ms", "LLM"),
+           ("total_ms", "total")]
+
+def build_timings_md(timings) -> str:
+    parts = [f"{label} {timings[key]:.0f} ms" for key, label in _STAGES if key in (timings or {})]
+    return f"_⏱️ {' · '.join(parts)}_" if parts else ""
+
+def build_result_md(result, display_mode, clean_extracts) -> str:
+    sources_md = build_sources_md(result.get("hits", []), display_mode=display_mode, clean=bool(clean_extracts))
+    timings_md = build_timings_md(result.get("timings"))
+    ctx = result.get("context")
+    if ctx:
+        timings_md += f" _— contexte {ctx['tokens']}/{ctx['budget']} tokens ({ctx['hits']} passages)_"
+    if result.get("cache"):
+        timings_md += f" _— réponse en cache (similarité {result['cache']['similarity']:.3f})_"
+    if timings_md:
+        sources_md += "\n\n" + timings_md
+    return sources_md
+
+async def submit_message(user_msg, chat_messages, top_k, display_mode, clean_extracts):
     if INIT_ERROR:
         err = f"⚠️ Initialisation impossible :\n\n> {INIT_ERROR}\n\nAssure-toi d'avoir `OPENAI_API_KEY`."
         chat_messages = chat_messages + [
             {"role": "user", "content": (user_msg or '').strip()},
             {"role": "assistant", "content": err},
         ]
-        return "", chat_messages, chat_messages, "_Erreur d’init_"
+        yield "", chat_messages, chat_messages, "_Erreur d’init_"
+        return
 
     q = (user_msg or "").strip()
     if not q:
-        return "", chat_messages, chat_messages, "_Saisis une question pour commencer._"
+        yield "", chat_messages, chat_messages, "_Saisis une question pour commencer._"
+        return
 
-    try:
-        PIPELINE.top_k = int(top_k)
-        history_pairs = _messages_to_pairs(chat_messages)
-        result = PIPELINE.answer(q, history_pairs)
-    except Exception as e:
-        err = f"❌ Erreur pendant l’inférence : {e}"
-        chat_messages = chat_messages + [
+    history_pairs = _messages_to_pairs(chat_messages)
+
+    def _with_reply(text):
+        return chat_messages + [
             {"role": "user", "content": q},
-            {"role": "assistant", "content": err},
+            {"role": "assistant", "content": text},
         ]
-        return "", chat_messages, chat_messages, "_Erreur pendant l’inférence_"
 
-    answer = result.get("answer", "Aucun passage pertinent trouvé.")
-    hits = result.get("hits", [])
-    sources_md = build_sources_md(hits, display_mode=display_mode, clean=bool(clean_extracts))
+    # question affichée tout de suite; sources dès la fin de la recherche, puis réponse token par token
+    reply, sources_md, result = "", "_Recherche des passages…_", None
+    yield "", _with_reply(reply), _with_reply(reply), sources_md
+    try:
+        # copie légère par requête (vs, llm, caches partagés): top_k propre à chaque question en vol
+        pipeline = copy.copy(PIPELINE)
+        pipeline.top_k = int(top_k)
+        # aclosing: flux fermé (tâches et requête au LLM comprises) à la sortie, même interrompue
+        async with contextlib.aclosing(pipeline.astream(q, history_pairs)) as events:
+            async for event in events:
+                if event["type"] == "sources":
+                    sources_md = build_result_md(event["result"], display_mode, clean_extracts)
+                elif event["type"] == "token":
+                    reply += event["text"]
+                else:
+                    result = event["result"]
+                    break
+                yield "", _with_reply(reply), _with_reply(reply), sources_md
+    except asyncio.TimeoutError:
+        err = "⌛ Délai dépassé : la réponse a pris trop de temps, réessaie ou réduis top-k."
+        reply = f"{reply}\n\n{err}" if reply else err
+        yield "", _with_reply(reply), _with_reply(reply), sources_md + "\n\n_Délai dépassé_"
+        return
+    except Exception as e:
+        err = f"❌ Erreur pendant l’inférence : {e}"
+        reply = f"{reply}\n\n{err}" if reply else err
+        yield "", _with_reply(reply), _with_reply(reply), "_Erreur pendant l’inférence_"
+        return
 
-    chat_messages = chat_messages + [
-        {"role": "user", "content": q},
-        {"role": "assistant", "content": answer},
-    ]
-    return "", chat_messages, chat_messages, sources_md
+    reply = result.get("answer", "Aucun passage pertinent trouvé.")
+    yield "", _with_reply(reply), _with_reply(reply), build_result_md(result, display_mode, clean_extracts)
 
 def clear_chat():
     return [], [], ""
@@ -180,5 +223,9 @@ with gr.Blocks(theme=theme, css=custom_css) as demo:
         outputs=[messages_state, chatbot, sources_md],
     )
 
+# handlers async: les questions attendent l'API sans bloquer de thread. File configurée à
+# l'import: aussi appliquée quand l'app est lancée par `gradio app.py` ou HF Spaces
+demo.queue(default_concurrency_limit=APP_CONCURRENCY)
+
 if __name__ == "__main__":
     demo.launch(server_name="0.0.0.0", server_port=7860)
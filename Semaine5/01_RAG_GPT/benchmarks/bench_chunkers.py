@@ -0,0 +1,53 @@
+"""Compare le chunker en tokens au RecursiveCharacterTextSplitter (caractères).
+
+Corpus: les pages de DATA_DIR, répétées jusqu'à --pages pages (500 par défaut).
+Mesures: nombre de chunks, tokens par chunk (moyenne, écart-type, CV, min/max), débit.
+
+Usage: python -m benchmarks.bench_chunkers [--pages 500] [--repeat 3]
+"""
+import argparse
+import os
+import statistics
+import time
+
+from fonctions.config import OPENAI_MODEL
+from fonctions.ingestion import _list_pdfs, _load_text_docs, _make_splitter
+from fonctions.tokens import count_tokens, get_encoding
+
+
+def _corpus(n_pages):
+    pages = [d for pdf in _list_pdfs() for d in _load_text_docs(pdf)]
+    if not pages:
+        raise SystemExit("Aucun PDF dans DATA_DIR.")
+    return [pages[i % len(pages)] for i in range(n_pages)]
+
+
+def _bench(name, splitter, docs, repeat):
+    best, chunks = float("inf"), []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        chunks = splitter.split_documents(docs)
+        best = min(best, time.perf_counter() - t0)
+    tokens = count_tokens([c.page_content for c in chunks], OPENAI_MODEL)
+    mean = statistics.mean(tokens)
+    std = statistics.pstdev(tokens)
+    print(f"{name:<10} {len(chunks):7d} {mean:8.1f} {std:8.1f} {std / mean:6.2f} "
+          f"{min(tokens):5d} {max(tokens):5d} {len(docs) / best:9.1f}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=500)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    docs = _corpus(args.pages)
+    tok = "tiktoken" if get_encoding(OPENAI_MODEL) is not None else "estimation (tiktoken indisponible)"
+    print(f"{len(docs)} pages, {os.cpu_count()} CPU, tokens mesurés avec {OPENAI_MODEL} [{tok}]\n")
+    print(f"{'chunker':<10} {'chunks':>7} {'tok moy':>8} {'tok σ':>8} {'CV':>6} {'min':>5} {'max':>5} {'pages/s':>9}")
+    _bench("chars", _make_splitter("chars"), docs, args.repeat)
+    _bench("tokens", _make_splitter("tokens"), docs, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
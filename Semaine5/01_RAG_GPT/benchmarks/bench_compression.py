@@ -0,0 +1,89 @@
+"""Compression extractive du contexte (fonctions/compression.py): tokens économisés et parité des réponses.
+
+Sur le jeu d'évaluation (benchmarks/eval_questions.jsonl), pour chaque question:
+retrieve (index ingéré, modèle d'embeddings configuré), puis contexte complet vs contexte
+compressé (COMPRESSION_SENTENCES phrases par passage), tous deux sous CONTEXT_TOKEN_BUDGET.
+- tokens du prompt complet envoyé au LLM, avec et sans compression;
+- avec --llm (OPENAI_API_KEY): réponse générée dans les deux cas; parité = part des nombres
+  de la réponse de référence que l'on retrouve dans la réponse compressée, et réponses
+  « identiques » quand les deux ensembles de nombres sont égaux.
+
+Usage: python -m benchmarks.bench_compression [--sentences 2,3,5] [--llm]
+"""
+import argparse
+import json
+import re
+import statistics
+import warnings
+from pathlib import Path
+
+from fonctions.compression import compress_hits
+from fonctions.config import CONTEXT_TOKEN_BUDGET, OPENAI_MODEL, TOP_K
+from fonctions.context import pack_context
+from fonctions.rag_pipeline import RAGPipeline
+from fonctions.retrieval import embed_query, get_vectorstore
+from fonctions.table_store import to_number
+from fonctions.tokens import count_tokens
+
+EVAL_SET = Path(__file__).with_name("eval_questions.jsonl")
+_NUMBER = re.compile(r"\(?-?\d[\d.,]*\s?%?\)?")
+
+
+def _numbers(text):
+    return {v for v in (to_number(m.group().rstrip(".,")) for m in _NUMBER.finditer(text or "")) if v is not None}
+
+
+def _prompt(pipe, question, hits):
+    context, _, packing = pack_context(hits, CONTEXT_TOKEN_BUDGET, OPENAI_MODEL)
+    inputs = {"question": question, "context": context, "history": "—"}
+    tokens = sum(count_tokens([m.content for m in pipe._qa_prompt.format_messages(**inputs)], OPENAI_MODEL))
+    return inputs, tokens
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sentences", default="2,3,5")
+    ap.add_argument("--llm", action="store_true", help="génère les réponses (OPENAI_API_KEY requise)")
+    args = ap.parse_args()
+    warnings.filterwarnings("ignore", message="Relevance scores must be between 0 and 1")
+
+    with open(EVAL_SET, "r", encoding="utf-8") as f:
+        questions = [json.loads(line)["question"] for line in f if line.strip()]
+    if args.llm:
+        pipe = RAGPipeline(top_k=TOP_K)
+    else:
+        pipe = RAGPipeline.for_retrieval(get_vectorstore(), TOP_K)  # retrieve + prompt seuls
+    chain = pipe._qa_prompt | pipe.llm | pipe._parser if args.llm else None
+
+    base = []
+    for q in questions:
+        qvec = embed_query(pipe.vs, q)
+        hits = pipe.retrieve(q, qvec=qvec)
+        inputs, tokens = _prompt(pipe, q, hits)
+        answer = chain.invoke(inputs) if chain else None
+        base.append((q, qvec, hits, tokens, answer))
+    if not any(hits for _, _, hits, _, _ in base):
+        raise SystemExit("Aucun passage: lancez d'abord l'ingestion.")
+
+    print(f"{len(questions)} questions, top_k={TOP_K}, budget={CONTEXT_TOKEN_BUDGET} tokens\n")
+    print(f"{'phrases':>8} {'tokens':>8} {'réduction':>10}" + (f" {'nombres':>8} {'identiques':>11}" if chain else ""))
+    print(f"{'complet':>8} {statistics.mean(b[3] for b in base):8.0f} {'-':>10}" + (f" {1.0:8.3f} {1.0:11.3f}" if chain else ""))
+    for n in [int(x) for x in args.sentences.split(",")]:
+        tokens, recall, same = [], [], []
+        for q, qvec, hits, base_tokens, base_answer in base:
+            small, _ = compress_hits(hits, qvec, pipe.vs.embeddings, n)
+            inputs, t = _prompt(pipe, q, small)
+            tokens.append(t)
+            if chain:
+                ref, got = _numbers(base_answer), _numbers(chain.invoke(inputs))
+                recall.append(len(ref & got) / len(ref) if ref else 1.0)
+                same.append(ref == got)
+        reduction = 1.0 - statistics.mean(tokens) / statistics.mean(b[3] for b in base)
+        line = f"{n:>8} {statistics.mean(tokens):8.0f} {reduction:9.1%}"
+        if chain:
+            line += f" {statistics.mean(recall):8.3f} {statistics.mean(same):11.3f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
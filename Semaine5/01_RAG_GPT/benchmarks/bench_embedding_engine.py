@@ -0,0 +1,70 @@
+"""Débit du moteur d'embeddings async vs OpenAIEmbeddings (LangChain), sur le faux serveur local.
+
+Usage: python -m benchmarks.bench_embedding_engine [--texts 2000] [--latency 0.05] [--max-rps 40]
+"""
+import argparse
+import random
+import time
+
+from langchain_openai import OpenAIEmbeddings
+
+from benchmarks.fake_embedding_server import FakeEmbeddingServer
+from fonctions.embedding_engine import AsyncEmbeddingEngine
+
+
+def _corpus(n: int, dup_ratio: float):
+    rnd = random.Random(0)
+    words = "revenue margin vehicle deliveries gross profit cash flow energy storage quarter".split()
+    base = [" ".join(rnd.choice(words) for _ in range(rnd.randint(60, 220))) + f" #{i}" for i in range(n)]
+    n_dup = int(n * dup_ratio)
+    return base[: n - n_dup] + [rnd.choice(base[: n - n_dup]) for _ in range(n_dup)]
+
+
+def _run(name, emb, texts):
+    t0 = time.perf_counter()
+    vectors = emb.embed_documents(texts)
+    dt = time.perf_counter() - t0
+    print(f"{name:<28} {dt:7.2f}s  {len(texts) / dt:8.1f} textes/s")
+    return vectors
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--texts", type=int, default=2000)
+    ap.add_argument("--dim", type=int, default=256)
+    ap.add_argument("--latency", type=float, default=0.05)
+    ap.add_argument("--per-token-latency", type=float, default=2e-5)
+    ap.add_argument("--max-rps", type=float, default=0.0, help="provoque des 429 au-delà de ce débit")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--batch-tokens", type=int, default=20000)
+    ap.add_argument("--dup-ratio", type=float, default=0.1)
+    args = ap.parse_args()
+
+    srv = FakeEmbeddingServer(dim=args.dim, latency=args.latency,
+                              per_token_latency=args.per_token_latency, max_rps=args.max_rps).start()
+    texts = _corpus(args.texts, args.dup_ratio)
+    print(f"{len(texts)} textes ({args.dup_ratio:.0%} doublons), serveur {srv.base_url}\n")
+    try:
+        baseline = OpenAIEmbeddings(
+            model="text-embedding-3-large", base_url=srv.base_url, api_key="fake",
+            check_embedding_ctx_length=False, max_retries=10,
+        )
+        ref = _run("LangChain (séquentiel)", baseline, texts)
+        srv.requests = srv.throttled = 0
+
+        engine = AsyncEmbeddingEngine(
+            model="text-embedding-3-large", base_url=srv.base_url, api_key="fake",
+            concurrency=args.concurrency, max_batch_tokens=args.batch_tokens,
+        )
+        out = _run(f"Async (x{args.concurrency}, {args.batch_tokens} tok)", engine, texts)
+        same = all(abs(a[0] - b[0]) < 1e-5 for a, b in zip(ref, out))
+        t = engine.throughput()
+        print(f"\nrequêtes: {t['requests']} | 429: {t['throttled']} | retries: {t['retries']} "
+              f"| textes uniques: {t['unique_texts']}/{t['texts']} | {t['tokens_per_s']} tokens/s")
+        print(f"Vecteurs identiques à la référence: {'oui' if same else 'NON'}")
+    finally:
+        srv.stop()
+
+
+if __name__ == "__main__":
+    main()
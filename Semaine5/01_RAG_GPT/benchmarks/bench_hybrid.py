@@ -0,0 +1,76 @@
+"""Vérifie qu'un passage trouvé par BM25 seul atteint les résultats de retrieve quand les tableaux abondent.
+
+Corpus synthétique: nombreux groupes de lignes de tableaux + paragraphes, dont certains portent un
+terme exact (code de poste) absent du reste. Embeddings factices: seul BM25 retrouve ces paragraphes.
+Mesure, pour chaque part HYBRID_TABLE_SHARE, la proportion de questions dont le paragraphe « BM25 seul »
+figure dans les top_k passages renvoyés, et le nombre de tableaux conservés en tête.
+
+Usage: python -m benchmarks.bench_hybrid [--k 8] [--questions 20] [--shares 1.0,0.75,0.5]
+"""
+import argparse
+import statistics
+import tempfile
+import warnings
+from pathlib import Path
+
+from langchain.schema import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+import fonctions.rag_pipeline as rag_pipeline
+from fonctions.bm25 import BM25Index
+from fonctions.numpy_store import NumpyVectorStore
+from fonctions.rag_pipeline import RAGPipeline
+
+
+def _corpus(n_questions, n_tables, n_texts):
+    docs = []
+    for i in range(n_tables):
+        rows = "\n".join(f"Poste {i}.{r} | {100 + r} | {90 + r}" for r in range(6))
+        docs.append(Document(page_content=f"Poste | 2023 | 2022\n{rows}", id=f"t{i}",
+                             metadata={"source": "rapport.pdf", "page": i // 4, "type": "table"}))
+    for i in range(n_texts):
+        docs.append(Document(page_content=f"Commentaire de gestion numéro {i} sur l'activité du groupe.", id=f"x{i}",
+                             metadata={"source": "rapport.pdf", "page": 40 + i, "type": "text"}))
+    for q in range(n_questions):
+        docs.append(Document(page_content=f"Le poste PX{q}Z couvre les engagements hors bilan de la filiale.",
+                             id=f"bm{q}", metadata={"source": "rapport.pdf", "page": 90 + q, "type": "text"}))
+    return docs
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--k", type=int, default=8)
+    ap.add_argument("--questions", type=int, default=20)
+    ap.add_argument("--shares", default="1.0,0.75,0.5")
+    args = ap.parse_args()
+    warnings.filterwarnings("ignore", message="Relevance scores must be between 0 and 1")
+
+    tmp = Path(tempfile.mkdtemp())
+    docs = _corpus(args.questions, n_tables=args.k * 4, n_texts=200)
+    vs = NumpyVectorStore(DeterministicFakeEmbedding(size=64), tmp / "numpy")
+    vs.add_documents(docs, ids=[d.id for d in docs])
+    bm25 = BM25Index(tmp / "bm25.sqlite")
+    bm25.add_documents(docs, [d.id for d in docs])
+    bm25.commit()
+    pipe = RAGPipeline.for_retrieval(vs, args.k, bm25=bm25)
+
+    print(f"{len(docs)} chunks ({args.k * 4} tableaux), top_k={args.k}, {args.questions} questions\n")
+    print(f"{'part tableaux':>14} {'BM25 seul retrouvé':>19} {'tableaux en tête':>17}")
+    reached_default = None
+    for share in [float(x) for x in args.shares.split(",")]:
+        rag_pipeline.HYBRID_TABLE_SHARE = share
+        reached, n_tables = [], []
+        for q in range(args.questions):
+            hits = pipe.retrieve(f"Que couvre le poste PX{q}Z ?")
+            reached.append(any(d.id == f"bm{q}" for d, _ in hits))
+            n_tables.append(sum(1 for d, _ in hits if d.metadata.get("type") == "table"))
+        rate = sum(reached) / len(reached)
+        print(f"{share:>14.2f} {rate:>19.2f} {statistics.mean(n_tables):>17.1f}")
+        if share == 0.5:
+            reached_default = rate
+    if reached_default is not None and reached_default < 1.0:
+        raise SystemExit("Échec: avec HYBRID_TABLE_SHARE=0.5, un passage trouvé par BM25 seul n'atteint pas les résultats.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Recherche en deux étages Matryoshka (dimensions tronquées puis re-ranking pleine dimension).
+
+Sur le jeu d'évaluation (benchmarks/eval_questions.jsonl), compare à la recherche exacte
+pleine dimension:
+- recall@k de la recherche vectorielle seule;
+- recall des passages renvoyés par RAGPipeline.retrieve (tables d'abord + MMR);
+- latence par requête et RAM de l'index de premier étage.
+
+Par défaut: l'index construit par l'ingestion (Chroma ou NumPy, VECTOR_BACKEND) et les
+questions vectorisées avec le modèle configuré (cache d'embeddings). --synthetic: vecteurs
+synthétiques à variance décroissante par dimension (profil Matryoshka), sans API.
+
+Usage: python -m benchmarks.bench_matryoshka [--dims 128,256,512] [--factors 8,16] [--synthetic]
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from fonctions.config import TOP_K
+from fonctions.numpy_store import NumpyVectorStore
+from fonctions.rag_pipeline import RAGPipeline
+
+EVAL_SET = Path(__file__).with_name("eval_questions.jsonl")
+
+
+class _Precomputed(Embeddings):
+    """Texte -> vecteur déjà calculé (aucun appel API pendant les mesures)."""
+
+    def __init__(self, table):
+        self.table = table
+
+    def embed_documents(self, texts):
+        return [self.table[t] for t in texts]
+
+    def embed_query(self, text):
+        return self.table[text]
+
+
+def _from_index(questions):
+    from fonctions.embeddings import get_embedding
+    from fonctions.retrieval import get_vectorstore
+
+    vs = get_vectorstore()
+    if isinstance(vs, NumpyVectorStore):
+        got = vs.get()
+        vectors = np.asarray(vs._matrix[[vs._rows[i] for i in got["ids"]]], dtype=np.float32)
+    else:
+        got = vs.get(include=["embeddings", "documents", "metadatas"])
+        vectors = np.asarray(got["embeddings"], dtype=np.float32)
+    if not len(vectors):
+        raise SystemExit("Index vide: lancez d'abord l'ingestion (ou --synthetic).")
+    table = dict(zip(got["documents"], vectors))
+    table.update(zip(questions, get_embedding().embed_documents(questions)))
+    return got["ids"], got["documents"], got["metadatas"], table
+
+
+def _synthetic(questions, n=20000, dim=3072, seed=0):
+    rng = np.random.default_rng(seed)
+    decay = (1.0 + np.arange(dim)) ** -0.5  # informations concentrées dans les premières dimensions
+    centers = rng.standard_normal((n // 100, dim)) * decay
+    x = centers[rng.integers(0, len(centers), n)] + 0.5 * rng.standard_normal((n, dim)) * decay
+    x = (x / np.linalg.norm(x, axis=1, keepdims=True)).astype(np.float32)
+    docs = [f"doc {i}" for i in range(n)]
+    metas = [{"type": "table_flat" if i % 5 == 0 else "text", "page": i // 3} for i in range(n)]
+    q = x[rng.integers(0, n, len(questions))] + 1.5 * rng.standard_normal((len(questions), dim)).astype(np.float32) * decay
+    table = dict(zip(docs, x))
+    table.update(zip(questions, q / np.linalg.norm(q, axis=1, keepdims=True)))
+    return [str(i) for i in range(n)], docs, metas, table
+
+
+def _measure(vs, questions, k):
+    pipe = RAGPipeline.for_retrieval(vs, TOP_K)  # retrieve seul: ni LLM ni index de tableaux
+    search, retrieved, times = [], [], []
+    for q in questions:
+        t0 = time.perf_counter()
+        hits = vs.similarity_search_with_relevance_scores(q, k=k)
+        times.append((time.perf_counter() - t0) * 1000)
+        search.append([d.id for d, _ in hits])
+        retrieved.append([d.id for d, _ in pipe.retrieve(q)])
+    return search, retrieved, statistics.mean(times)
+
+
+def _recall(runs, gold):
+    return statistics.mean(len(set(a) & set(b)) / max(1, len(b)) for a, b in zip(runs, gold))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--dims", default="128,256,512")
+    ap.add_argument("--factors", default="8,16")
+    ap.add_argument("--k", type=int, default=TOP_K)
+    ap.add_argument("--synthetic", action="store_true")
+    args = ap.parse_args()
+    warnings.filterwarnings("ignore", message="Relevance scores must be between 0 and 1")
+
+    with open(EVAL_SET, "r", encoding="utf-8") as f:
+        questions = [json.loads(line)["question"] for line in f if line.strip()]
+    ids, docs, metas, table = (_synthetic if args.synthetic else _from_index)(questions)
+    emb = _Precomputed(table)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        exact = NumpyVectorStore(emb, Path(tmp))
+        for i in range(0, len(ids), 5000):
+            exact.add_texts(docs[i:i + 5000], metas[i:i + 5000], ids=ids[i:i + 5000])
+        gold_search, gold_retrieve, base_ms = _measure(exact, questions, args.k)
+        full = exact.memory_bytes()["vectors"]
+        print(f"{len(ids)} chunks x {exact.dim} dimensions, {len(questions)} questions, k={args.k}\n")
+        print(f"{'1er étage':<12} {'re-rank':>7} {'recall@k':>9} {'retrieve':>9} {'RAM index':>10} {'ms/req.':>8}")
+        print(f"{'exact':<12} {'-':>7} {1.0:9.3f} {1.0:9.3f} {full / 2**20:8.1f}Mo {base_ms:8.2f}")
+        for dims in [int(d) for d in args.dims.split(",")]:
+            for factor in [int(x) for x in args.factors.split(",")]:
+                vs = NumpyVectorStore(emb, Path(tmp), quantization="matryoshka",
+                                      rescore_factor=factor, truncate_dims=dims)
+                search, retrieved, ms = _measure(vs, questions, args.k)
+                print(f"{f'{dims}-d':<12} {f'x{factor}':>7} {_recall(search, gold_search):9.3f} "
+                      f"{_recall(retrieved, gold_retrieve):9.3f} {vs.memory_bytes()['codes'] / 2**20:8.1f}Mo {ms:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Noyau MMR vectorisé (fonctions/mmr.py) selon fetch_k.
+
+Compare, sur des candidats synthétiques normalisés (requête = candidat bruité):
+- `maximal_marginal_relevance` de langchain_core (référence, utilisée par Chroma);
+- l'ancien noyau NumPy: matrice de similarité m x m calculée d'un coup;
+- `mmr_rank`: une mise à jour de la redondance par produit matrice-vecteur et par étape.
+Vérifie que les trois sélections sont identiques et mesure la latence moyenne.
+
+Usage: python -m benchmarks.bench_mmr [--fetch 100,500,1000,2000,5000] [--dim 1536] [--k 8] [--lambda-mult 0.5]
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+from langchain_core.vectorstores.utils import maximal_marginal_relevance
+
+from fonctions.mmr import mmr_rank, normalize
+
+
+def _gram_mmr(query, candidates, k, lambda_mult):
+    """Ancienne version: similarités candidats x candidats en un seul produit (m, m)."""
+    rel = candidates @ query
+    sims = candidates @ candidates.T
+    chosen = [int(np.argmax(rel))]
+    redundancy = sims[chosen[0]].copy()
+    available = np.ones(len(candidates), dtype=bool)
+    available[chosen[0]] = False
+    while len(chosen) < min(k, len(candidates)):
+        score = lambda_mult * rel - (1.0 - lambda_mult) * redundancy
+        score[~available] = -np.inf
+        i = int(np.argmax(score))
+        chosen.append(i)
+        available[i] = False
+        np.maximum(redundancy, sims[i], out=redundancy)
+    return chosen
+
+
+def _time(fn, repeat):
+    fn()  # échauffement
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return out, statistics.mean(times)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--fetch", default="100,500,1000,2000,5000")
+    ap.add_argument("--dim", type=int, default=1536)
+    ap.add_argument("--k", type=int, default=8)
+    ap.add_argument("--lambda-mult", type=float, default=0.5)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"dim={args.dim}, k={args.k}, lambda={args.lambda_mult}, moyenne sur {args.repeat} requêtes\n")
+    print(f"{'fetch_k':>8} {'langchain':>10} {'m x m':>9} {'mmr_rank':>9} {'identiques':>11}")
+    for m in [int(x) for x in args.fetch.split(",")]:
+        centers = rng.standard_normal((max(4, m // 50), args.dim))
+        cands = normalize(centers[rng.integers(0, len(centers), m)] + 0.7 * rng.standard_normal((m, args.dim)))
+        query = normalize(cands[0] + 0.5 * rng.standard_normal(args.dim))
+
+        ref, t_ref = _time(lambda: maximal_marginal_relevance(query, cands, args.lambda_mult, args.k), args.repeat)
+        gram, t_gram = _time(lambda: _gram_mmr(query, cands, args.k, args.lambda_mult), args.repeat)
+        new, t_new = _time(lambda: [i for i, _ in mmr_rank(query, cands, args.k, args.lambda_mult)], args.repeat)
+        same = list(ref) == gram == new
+        print(f"{m:>8} {t_ref:8.2f}ms {t_gram:7.2f}ms {t_new:7.2f}ms {str(same):>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Compare le parsing PDF série vs process pool sur les PDF de DATA_DIR.
+
+Usage: python -m benchmarks.bench_parallel_parsing [--workers 8] [--pages-per-task 20]
+"""
+import argparse
+import os
+import time
+
+from fonctions.config import INGEST_WORKERS, PAGES_PER_TASK
+from fonctions.ingestion import _list_pdfs, _parse_pdfs
+
+
+def _signature(parsed):
+    return [
+        (src, d.metadata.get("page"), d.metadata.get("type"), d.page_content)
+        for src in sorted(parsed)
+        for d in parsed[src]
+    ]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=max(2, INGEST_WORKERS))
+    ap.add_argument("--pages-per-task", type=int, default=PAGES_PER_TASK)
+    args = ap.parse_args()
+
+    pdfs = _list_pdfs()
+    if not pdfs:
+        raise SystemExit("Aucun PDF dans DATA_DIR.")
+
+    t0 = time.perf_counter()
+    serial, _ = _parse_pdfs(pdfs, workers=1, pages_per_task=args.pages_per_task)
+    serial_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    parallel, stats = _parse_pdfs(pdfs, workers=args.workers, pages_per_task=args.pages_per_task)
+    parallel_s = time.perf_counter() - t0
+
+    n_docs = sum(len(v) for v in serial.values())
+    print(f"PDF: {len(pdfs)} | documents: {n_docs} | tâches: {stats['tasks']} | workers: {stats['workers']}")
+    print(f"Série    : {serial_s:.2f}s")
+    print(f"Parallèle: {parallel_s:.2f}s")
+    print(f"Speedup  : x{serial_s / parallel_s:.2f}")
+    same = _signature(serial) == _signature(parallel)
+    print(f"Contenu identique (texte, pages, ordre): {'oui' if same else 'NON'}")
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    main()
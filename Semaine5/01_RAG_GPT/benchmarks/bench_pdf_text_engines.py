@@ -0,0 +1,64 @@
+"""Compare les moteurs d'extraction de texte PDF sur les PDF de DATA_DIR.
+
+Pour chaque moteur installé: pages/seconde, caractères extraits et parité
+avec pypdf (ratio de caractères, recouvrement des mots page par page).
+
+Usage: python -m benchmarks.bench_pdf_text_engines [--engines pypdf,pymupdf] [--repeat 3]
+"""
+import argparse
+import re
+import time
+
+from fonctions.ingestion import _list_pdfs
+from fonctions.pdf_text import ENGINES, extract_text_docs
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def _words(text: str) -> set:
+    return set(w.lower() for w in _WORD.findall(text or ""))
+
+
+def _run(engine, pdfs, repeat):
+    best, docs = float("inf"), []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        docs = [d for pdf in pdfs for d in extract_text_docs(pdf, engine=engine)]
+        best = min(best, time.perf_counter() - t0)
+    return docs, best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--engines", default=",".join(ENGINES))
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    pdfs = _list_pdfs()
+    if not pdfs:
+        raise SystemExit("Aucun PDF dans DATA_DIR.")
+
+    ref, _ = _run("pypdf", pdfs, 1)
+    ref_chars = sum(len(d.page_content) for d in ref)
+    print(f"{len(pdfs)} PDF, {len(ref)} pages (référence pypdf: {ref_chars} caractères)\n")
+    print(f"{'moteur':<12} {'pages/s':>9} {'caractères':>11} {'ratio':>7} {'mots communs':>13}  métadonnées")
+    for engine in args.engines.split(","):
+        try:
+            docs, dt = _run(engine, pdfs, args.repeat)
+        except ImportError as e:
+            print(f"{engine:<12} non installé ({e.name})")
+            continue
+        chars = sum(len(d.page_content) for d in docs)
+        overlaps = []
+        for a, b in zip(ref, docs):
+            wa, wb = _words(a.page_content), _words(b.page_content)
+            if wa or wb:
+                overlaps.append(len(wa & wb) / len(wa | wb))
+        same_meta = [(d.metadata["source"], d.metadata["page"], d.metadata["type"]) for d in docs] == \
+                    [(d.metadata["source"], d.metadata["page"], d.metadata["type"]) for d in ref]
+        print(f"{engine:<12} {len(docs) / dt:9.1f} {chars:11d} {chars / max(1, ref_chars):7.3f} "
+              f"{sum(overlaps) / max(1, len(overlaps)):13.3f}  {'identiques' if same_meta else 'DIFFÉRENTES'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Index compressé (int8 / binaire + re-scoring exact) vs recherche exacte float32.
+
+Vecteurs synthétiques normalisés, regroupés en clusters (proche d'embeddings réels),
+requêtes = documents bruités. Pour chaque configuration de NumpyVectorStore:
+recall@k par rapport à la recherche exacte, mémoire de l'index en RAM, latence.
+
+Usage: python -m benchmarks.bench_vector_index [--n 20000] [--dim 1536] [--queries 200] [--k 10]
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from fonctions.numpy_store import NumpyVectorStore
+
+CONFIGS = [
+    ("float32", "none", 1),
+    ("float16", "none", 1),
+    ("float32", "int8", 4),
+    ("float32", "int8", 8),
+    ("float32", "binary", 8),
+    ("float32", "binary", 32),
+    ("float16", "binary", 32),
+]
+
+
+class _Precomputed(Embeddings):
+    """Texte "i" -> i-ème vecteur du corpus synthétique."""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def embed_documents(self, texts):
+        return self.vectors[[int(t) for t in texts]]
+
+    def embed_query(self, text):
+        return self.vectors[int(text)]
+
+
+def _corpus(n, dim, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(8, n // 200), dim)).astype(np.float32)
+    x = centers[rng.integers(0, len(centers), n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def _build(path, vectors, dtype, quantization, factor):
+    store = NumpyVectorStore(_Precomputed(vectors), path, dtype=dtype,
+                             quantization=quantization, rescore_factor=factor)
+    ids = [str(i) for i in range(len(vectors))]
+    for i in range(0, len(ids), 5000):
+        store.add_texts(ids[i:i + 5000], [{} for _ in ids[i:i + 5000]], ids=ids[i:i + 5000])
+    return store
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=20000)
+    ap.add_argument("--dim", type=int, default=1536)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=10)
+    args = ap.parse_args()
+
+    vectors = _corpus(args.n, args.dim)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.integers(0, args.n, args.queries)] + 0.8 * rng.standard_normal(
+        (args.queries, args.dim)).astype(np.float32) / np.sqrt(args.dim) * 4
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    truth = [set(np.argsort(-(vectors @ q))[:args.k]) for q in queries]
+
+    print(f"{args.n} vecteurs x {args.dim} dimensions, {args.queries} requêtes, recall@{args.k}\n")
+    print(f"{'vecteurs':<9} {'codes':<7} {'re-score':>8} {'recall':>7} {'RAM index':>10} {'ms moy.':>8} {'ms p95':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for dtype, quantization, factor in CONFIGS:
+            store = _build(Path(tmp) / f"{dtype}-{quantization}-{factor}", vectors, dtype, quantization, factor)
+            mem = store.memory_bytes()
+            ram = mem["codes"] if quantization != "none" else mem["vectors"]  # float mappé mais lu en entier
+            store.similarity_search_with_score_by_vector(queries[0], k=args.k)  # échauffement
+            times, recalls = [], []
+            for q, gold in zip(queries, truth):
+                t0 = time.perf_counter()
+                hits = store.similarity_search_with_score_by_vector(q, k=args.k)
+                times.append((time.perf_counter() - t0) * 1000)
+                recalls.append(len({int(d.id) for d, _ in hits} & gold) / args.k)
+            times.sort()
+            label = f"x{factor}" if quantization != "none" else "-"
+            print(f"{dtype:<9} {quantization:<7} {label:>8} {statistics.mean(recalls):7.3f} "
+                  f"{ram / 2**20:8.1f}Mo {statistics.mean(times):8.2f} {times[int(0.95 * (len(times) - 1))]:7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Faux serveur d'embeddings compatible OpenAI (/v1/embeddings), pour tests et benchmarks.
+
+- vecteurs déterministes (dérivés du hash du texte), normalisés L2;
+- latence simulée: `latency` + `per_token_latency` * tokens;
+- limite de débit optionnelle (requêtes/s) -> réponses 429 avec Retry-After.
+
+Usage: python -m benchmarks.fake_embedding_server --port 8765 --dim 3072
+puis OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=fake ...
+"""
+import argparse
+import base64
+import hashlib
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+def fake_vector(text: str, dim: int) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    v = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return v / np.linalg.norm(v)
+
+
+class FakeEmbeddingServer:
+    def __init__(self, port: int = 0, dim: int = 3072, latency: float = 0.05,
+                 per_token_latency: float = 0.0, max_rps: float = 0.0):
+        self.dim = dim
+        self.latency = latency
+        self.per_token_latency = per_token_latency
+        self.max_rps = max_rps
+        self.requests = 0
+        self.throttled = 0
+        self._window: deque = deque()
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if server._throttle():
+                    self._send(429, {"error": {"message": "Rate limit reached", "type": "rate_limit"}},
+                               {"retry-after": "0.2"})
+                    return
+                inputs = body.get("input") or []
+                if isinstance(inputs, str):
+                    inputs = [inputs]
+                dim = int(body.get("dimensions") or server.dim)
+                tokens = sum(len(t) // 4 + 1 for t in inputs)
+                time.sleep(server.latency + server.per_token_latency * tokens)
+                data = []
+                for i, t in enumerate(inputs):
+                    v = fake_vector(t, server.dim)[:dim]
+                    v = v / np.linalg.norm(v)
+                    if body.get("encoding_format") == "base64":
+                        emb = base64.b64encode(v.astype(np.float32).tobytes()).decode("ascii")
+                    else:
+                        emb = v.tolist()
+                    data.append({"object": "embedding", "index": i, "embedding": emb})
+                self._send(200, {
+                    "object": "list", "data": data, "model": body.get("model"),
+                    "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+                })
+
+            def _send(self, code, payload, headers=None):
+                raw = json.dumps(payload).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(raw)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.base_url = f"http://127.0.0.1:{self.port}/v1"
+
+    def _throttle(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            if not self.max_rps:
+                return False
+            now = time.monotonic()
+            while self._window and now - self._window[0] > 1.0:
+                self._window.popleft()
+            if len(self._window) >= self.max_rps:
+                self.throttled += 1
+                return True
+            self._window.append(now)
+            return False
+
+    def start(self) -> "FakeEmbeddingServer":
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--dim", type=int, default=3072)
+    ap.add_argument("--latency", type=float, default=0.05)
+    ap.add_argument("--max-rps", type=float, default=0.0)
+    args = ap.parse_args()
+    srv = FakeEmbeddingServer(args.port, args.dim, args.latency, max_rps=args.max_rps)
+    print(f"Faux serveur d'embeddings sur {srv.base_url}")
+    srv.httpd.serve_forever()
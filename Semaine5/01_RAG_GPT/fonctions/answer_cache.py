@@ -0,0 +1,144 @@
+from __future__ import annotations
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from fonctions.mmr import normalize
+from fonctions.table_store import figures
+
+# Cache sémantique des réponses de RAGPipeline.answer (SQLite + miroir NumPy en RAM).
+# Une question déjà traitée, même reformulée (cosinus >= threshold entre embeddings), renvoie
+# la réponse enregistrée sans recherche ni appel au LLM, à condition d'avoir:
+#   - la même portée: version du corpus indexé + version du prompt (modèle, top_k);
+#   - le même historique (hash; "" sans historique);
+#   - les mêmes périodes et nombres cités ("T1 2023" != "T2 2023" malgré des embeddings voisins).
+# Expiration (ttl_s) et éviction LRU au-delà de max_entries.
+
+def corpus_version(manifest_path: Path) -> str:
+    """Hash du manifest d'ingestion: change dès qu'un PDF ou la config d'indexation change."""
+    try:
+        return hashlib.sha256(manifest_path.read_bytes()).hexdigest()[:16]
+    except OSError:
+        return "empty"
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()[:16]
+
+class SemanticAnswerCache:
+    """Réponses indexées par l'embedding normalisé de la question."""
+
+    def __init__(self, path: Path, threshold: float = 0.95, ttl_s: float = 86400.0, max_entries: int = 1000):
+        self.threshold = threshold
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " id INTEGER PRIMARY KEY, scope TEXT NOT NULL, history TEXT NOT NULL, figures TEXT NOT NULL,"
+            " question TEXT NOT NULL, vec BLOB NOT NULL, result TEXT NOT NULL,"
+            " created REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_answers_access ON answers(last_access)")
+        self._db.commit()
+        self._load()
+
+    def _load(self) -> None:
+        """Miroir en RAM (clés + vecteurs) des entrées non expirées."""
+        self._db.execute("DELETE FROM answers WHERE created < ?", (time.time() - self.ttl_s,))
+        self._db.commit()
+        rows = self._db.execute("SELECT id, scope, history, figures, created, vec FROM answers ORDER BY id").fetchall()
+        if rows:  # autre modèle d'embeddings: seules les entrées de la dimension la plus récente restent
+            stale = [(r[0],) for r in rows if len(r[5]) != len(rows[-1][5])]
+            if stale:
+                self._db.executemany("DELETE FROM answers WHERE id=?", stale)
+                self._db.commit()
+                rows = [r for r in rows if len(r[5]) == len(rows[-1][5])]
+        self._ids = [r[0] for r in rows]
+        self._keys = [(r[1], r[2], r[3]) for r in rows]
+        self._created = np.array([r[4] for r in rows], dtype=np.float64)
+        self._vecs = (np.stack([np.frombuffer(r[5], dtype=np.float32) for r in rows])
+                      if rows else np.zeros((0, 0), dtype=np.float32))
+
+    def lookup(self, qvec: List[float], scope: str, history: str, question: str) -> Optional[Dict[str, Any]]:
+        """Réponse enregistrée la plus proche (+ `similarity`, `question` d'origine), sinon None."""
+        key = (scope, history, "|".join(figures(question)))
+        with self._lock:
+            best, best_sim = None, self.threshold
+            if self._ids and self._vecs.shape[1] == len(qvec):
+                alive = self._created >= time.time() - self.ttl_s
+                cand = [i for i, k in enumerate(self._keys) if k == key and alive[i]]
+                if cand:
+                    sims = self._vecs[cand] @ normalize(qvec)
+                    j = int(np.argmax(sims))
+                    if sims[j] >= best_sim:
+                        best, best_sim = cand[j], float(sims[j])
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            row_id = self._ids[best]
+            question_0, result = self._db.execute(
+                "SELECT question, result FROM answers WHERE id=?", (row_id,)
+            ).fetchone()
+            self._db.execute("UPDATE answers SET last_access=? WHERE id=?", (time.time(), row_id))
+            self._db.commit()
+        out = json.loads(result)
+        out["cache"] = {"similarity": round(best_sim, 4), "question": question_0}
+        return out
+
+    def store(self, qvec: List[float], scope: str, history: str, question: str, result: Dict[str, Any]) -> None:
+        now = time.time()
+        vec = normalize(qvec)
+        sig = "|".join(figures(question))
+        with self._lock:
+            cur = self._db.execute(
+                "INSERT INTO answers(scope, history, figures, question, vec, result, created, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (scope, history, sig, question, vec.tobytes(),
+                 json.dumps(result, ensure_ascii=False, default=str), now, now),
+            )
+            expired = self._db.execute("DELETE FROM answers WHERE created < ?", (now - self.ttl_s,)).rowcount
+            (count,) = self._db.execute("SELECT COUNT(*) FROM answers").fetchone()
+            if count > self.max_entries:  # LRU
+                self._db.execute(
+                    "DELETE FROM answers WHERE id IN ("
+                    " SELECT id FROM answers ORDER BY last_access ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+                self.evicted += count - self.max_entries
+            self._db.commit()
+            if expired or count > self.max_entries or (self._ids and self._vecs.shape[1] != len(vec)):
+                self._load()
+                return
+            self._ids.append(cur.lastrowid)
+            self._keys.append((scope, history, sig))
+            self._created = np.append(self._created, now)
+            self._vecs = vec[None, :] if not len(self._vecs) else np.vstack([self._vecs, vec])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM answers")
+            self._db.commit()
+            self._load()
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "entries": len(self._ids),
+            "evicted": self.evicted,
+        }
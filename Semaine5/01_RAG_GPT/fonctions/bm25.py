@@ -0,0 +1,155 @@
+from __future__ import annotations
+import json
+import math
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from langchain.schema import Document
+
+from fonctions.utils import match_filter
+
+# Index inversé BM25 persistant (SQLite) sur les mêmes chunks que la base vectorielle:
+# retrouve les termes exacts (postes comptables, "GAAP", tickers, montants) que la
+# recherche par embeddings rate. Alimenté par l'ingestion en même temps que les upserts.
+
+_TOKEN = re.compile(r"\d+(?:[.,]\d+)*%?|[a-z][a-z0-9]*")
+_THOUSANDS = re.compile(r"^\d{1,3}(,\d{3})+$")
+
+def tokenize(text: str) -> List[str]:
+    """minuscules sans accents; montants normalisés: '23,329' -> '23329', '19,3' -> '19.3'."""
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode("ascii").lower()
+    out = []
+    for tok in _TOKEN.findall(text):
+        if tok[0].isdigit():
+            tok = tok.replace(",", "") if _THOUSANDS.match(tok.rstrip("%")) else tok.replace(",", ".")
+        out.append(tok)
+    return out
+
+class BM25Index:
+    """BM25 (k1, b) sur SQLite: postings(term, id, tf) + docs(id, source, length, text, metadata)."""
+
+    def __init__(self, path: Path, k1: float = 1.5, b: float = 0.75):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.k1, self.b = k1, b
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            " id TEXT PRIMARY KEY, source TEXT, length INTEGER NOT NULL,"
+            " text TEXT NOT NULL, metadata TEXT NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            " term TEXT NOT NULL, id TEXT NOT NULL, tf INTEGER NOT NULL,"
+            " PRIMARY KEY (term, id)) WITHOUT ROWID"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_postings_id ON postings(id)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_docs_source ON docs(source)")
+        self._db.commit()
+        self._stats: Optional[Tuple[int, float]] = None
+        self._version: Optional[int] = None
+
+    # --- écriture (ingestion) ---
+
+    def _delete(self, ids: List[str]) -> None:
+        for i in range(0, len(ids), 500):  # limite de variables SQLite
+            part = ids[i:i + 500]
+            marks = ",".join("?" * len(part))
+            self._db.execute(f"DELETE FROM postings WHERE id IN ({marks})", part)
+            self._db.execute(f"DELETE FROM docs WHERE id IN ({marks})", part)
+
+    def add_documents(self, docs: List[Document], ids: List[str]) -> None:
+        """Upsert: un ID déjà indexé est remplacé."""
+        rows, postings = [], []
+        for cid, doc in zip(ids, docs):
+            tokens = tokenize(doc.page_content or "")
+            meta = doc.metadata or {}
+            rows.append((cid, meta.get("source"), len(tokens), doc.page_content or "",
+                         json.dumps(meta, ensure_ascii=False)))
+            postings.extend((term, cid, tf) for term, tf in Counter(tokens).items())
+        with self._lock:
+            self._delete(list(ids))
+            self._db.executemany("INSERT INTO docs VALUES (?, ?, ?, ?, ?)", rows)
+            self._db.executemany("INSERT INTO postings VALUES (?, ?, ?)", postings)
+
+    def delete_source(self, source: str, keep: Optional[Set[str]] = None) -> int:
+        keep = keep or set()
+        with self._lock:
+            ids = [i for (i,) in self._db.execute("SELECT id FROM docs WHERE source=?", (source,)) if i not in keep]
+            self._delete(ids)
+        return len(ids)
+
+    def commit(self) -> None:
+        with self._lock:
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    # --- recherche ---
+
+    def _corpus_stats(self) -> Tuple[int, float]:
+        (version,) = self._db.execute("PRAGMA data_version").fetchone()
+        if version != self._version or self._stats is None:
+            n, avg = self._db.execute("SELECT COUNT(*), AVG(length) FROM docs").fetchone()
+            self._stats, self._version = (n or 0, avg or 0.0), version
+        return self._stats
+
+    def search(self, query: str, k: int = 10, filter: Optional[Dict[str, Any]] = None) -> List[Tuple[Document, float]]:
+        """Top-k BM25 (score brut, décroissant); `filter` au format Chroma sur les métadonnées."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        scores: Dict[str, float] = {}
+        with self._lock:
+            n, avgdl = self._corpus_stats()
+            if not n:
+                return []
+            for term in terms:
+                rows = self._db.execute(
+                    "SELECT p.id, p.tf, d.length FROM postings p JOIN docs d ON d.id = p.id WHERE p.term = ?",
+                    (term,),
+                ).fetchall()
+                if not rows:
+                    continue
+                idf = math.log(1.0 + (n - len(rows) + 0.5) / (len(rows) + 0.5))
+                for cid, tf, length in rows:
+                    norm = tf + self.k1 * (1.0 - self.b + self.b * length / max(avgdl, 1e-9))
+                    scores[cid] = scores.get(cid, 0.0) + idf * tf * (self.k1 + 1.0) / norm
+            ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+            out: List[Tuple[Document, float]] = []
+            for i in range(0, len(ranked), 200):  # métadonnées lues par paquets, filtre appliqué au fil de l'eau
+                part = ranked[i:i + 200]
+                found = {
+                    cid: (text, json.loads(meta))
+                    for cid, text, meta in self._db.execute(
+                        f"SELECT id, text, metadata FROM docs WHERE id IN ({','.join('?' * len(part))})",
+                        [cid for cid, _ in part],
+                    )
+                }
+                for cid, score in part:
+                    text, meta = found[cid]
+                    if filter and not match_filter(meta, filter):
+                        continue
+                    out.append((Document(page_content=text, metadata=meta, id=cid), score))
+                    if len(out) >= k:
+                        return out
+        return out
+
+def rrf_fuse(runs: Iterable[List[Tuple[Document, float]]], k: int = 60,
+             key=None) -> List[Tuple[Document, float]]:
+    """Reciprocal Rank Fusion: score = somme des 1 / (k + rang) sur les listes où le chunk apparaît."""
+    key = key or (lambda d: d.id)
+    fused: Dict[Any, List[Any]] = {}
+    for run in runs:
+        for rank, (doc, _) in enumerate(run, start=1):
+            entry = fused.setdefault(key(doc), [doc, 0.0])
+            entry[1] += 1.0 / (k + rank)
+    return sorted(((d, s) for d, s in fused.values()), key=lambda x: x[1], reverse=True)
@@ -0,0 +1,66 @@
+from __future__ import annotations
+from importlib.metadata import PackageNotFoundError, version
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from langchain.schema import Document
+from langchain_chroma import Chroma
+
+from fonctions.mmr import mmr_hits, normalize
+
+# Recherches par vecteur sur Chroma. Seul module à toucher aux API privées de langchain-chroma
+# (`_collection.query` pour lire les candidats avec leurs embeddings en une requête,
+# `_select_relevance_score_fn` pour convertir les distances): réservées aux versions vérifiées,
+# API publique sinon.
+
+_TESTED = ("0.1.", "0.2.")  # versions de langchain-chroma dont les API privées ont été vérifiées
+
+def _installed() -> str:
+    try:
+        return version("langchain-chroma")
+    except PackageNotFoundError:
+        return ""
+
+_PRIVATE_API = _installed().startswith(_TESTED)
+
+def _relevance_fn(vs: Chroma) -> Callable[[float], float]:
+    """Distance -> pertinence [0, 1] selon la métrique de la collection (cosine, l2, ip)."""
+    if _PRIVATE_API:
+        try:
+            return vs._select_relevance_score_fn()
+        except (AttributeError, ValueError):
+            pass
+    return lambda d: 1.0 / (1.0 + max(0.0, d))  # repli: même ordre, échelle approchée
+
+def search(vs: Chroma, embedding: Sequence[float], k: int,
+           filter: Optional[Dict[str, Any]] = None) -> List[Tuple[Document, float]]:
+    raw = vs.similarity_search_by_vector_with_relevance_scores(list(embedding), k=k, filter=filter)  # distances brutes
+    relevance = _relevance_fn(vs)
+    return [(doc, relevance(dist)) for doc, dist in raw]
+
+def mmr_search(vs: Chroma, embedding: Sequence[float], k: int, fetch_k: int, lambda_mult: float,
+               filter: Optional[Dict[str, Any]] = None) -> List[Tuple[Document, float]]:
+    """MMR (fonctions/mmr.py) sur fetch_k candidats lus en une requête avec leurs embeddings."""
+    collection = getattr(vs, "_collection", None) if _PRIVATE_API else None
+    if collection is None or not hasattr(collection, "query"):
+        return _public_mmr_search(vs, embedding, k, fetch_k, lambda_mult, filter)
+    res = collection.query(
+        query_embeddings=[list(embedding)], n_results=fetch_k, where=filter or None,
+        include=["documents", "metadatas", "distances", "embeddings"],
+    )
+    ids, texts, metas = res["ids"][0], res["documents"][0], res["metadatas"][0]
+    if not ids:
+        return []
+    relevance = _relevance_fn(vs)
+    return mmr_hits(
+        normalize(embedding), normalize(res["embeddings"][0]), [relevance(d) for d in res["distances"][0]],
+        k, lambda_mult, lambda i: Document(page_content=texts[i] or "", metadata=metas[i] or {}, id=ids[i]),
+    )
+
+def _public_mmr_search(vs: Chroma, embedding: Sequence[float], k: int, fetch_k: int, lambda_mult: float,
+                       filter: Optional[Dict[str, Any]]) -> List[Tuple[Document, float]]:
+    # repli API publique: deux requêtes (MMR de Chroma sans score, puis pertinence des candidats)
+    docs = vs.max_marginal_relevance_search_by_vector(
+        list(embedding), k=k, fetch_k=fetch_k, lambda_mult=lambda_mult, filter=filter
+    )
+    scores = {doc.id: score for doc, score in search(vs, embedding, fetch_k, filter)}
+    return sorted(((doc, scores.get(doc.id, 0.0)) for doc in docs), key=lambda h: h[1], reverse=True)
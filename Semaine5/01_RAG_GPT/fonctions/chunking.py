@@ -0,0 +1,129 @@
+from __future__ import annotations
+import re
+from typing import List, NamedTuple
+
+import numpy as np
+
+from langchain.schema import Document
+
+from fonctions.tokens import token_ends
+
+# coupures: ponctuation finale suivie d'espaces, ou ligne vide. Un simple retour à la ligne
+# (mise en page PDF) n'est pas une frontière et n'est pas capturé: aucune boucle Python par ligne.
+_CANDIDATE = re.compile(r"[\.\!\?;…]\s+|\n\s*\n\s*")
+
+
+class _Unit(NamedTuple):
+    start: int
+    end: int
+    tokens: int
+    para_end: bool  # la phrase termine un paragraphe
+
+
+class TokenChunker:
+    """Découpe en chunks mesurés en tokens du modèle, alignés sur les phrases et paragraphes.
+
+    - chaque page est tokenisée une seule fois (tiktoken, multi-thread au-delà de quelques
+      centaines de pages); les phrases sont comptées en plaçant leurs débuts sur ce flux de
+      tokens, sans ré-encoder ni les phrases ni le recouvrement;
+    - un chunk se ferme de préférence en fin de paragraphe s'il est déjà rempli à moitié;
+    - le recouvrement reprend les dernières phrases entières (<= overlap_tokens);
+    - une phrase plus longue que le budget est coupée en morceaux égaux sur des frontières de tokens;
+    - la taille visée est équilibrée sur la page (T tokens -> ceil(T/budget) chunks voisins),
+      ce qui évite un dernier chunk minuscule et réduit la variance.
+    Chaque chunk garde `start_index` (position dans la page) comme le splitter LangChain.
+    """
+
+    def __init__(self, chunk_tokens: int, overlap_tokens: int, model: str):
+        self.chunk_tokens = max(8, chunk_tokens)
+        self.overlap_tokens = max(0, min(overlap_tokens, self.chunk_tokens // 2))
+        self.model = model
+
+    @staticmethod
+    def _sentences(text: str) -> List[tuple]:
+        """[(début, fin, fin_de_paragraphe)] des phrases de `text`."""
+        spans = []
+        pos = 0
+        for m in _CANDIDATE.finditer(text):
+            sep = m.group()
+            para = sep.count("\n") >= 2  # ligne vide = fin de paragraphe
+            end = m.start() + (sep[0] != "\n")  # garde la ponctuation dans la phrase
+            if end > pos and (pos or not text[:end].isspace()):
+                spans.append((pos, end, para))
+            pos = m.end()
+        if text[pos:].strip():
+            spans.append((pos, len(text), True))
+        return spans
+
+    def _units(self, spans: List[tuple], ends: np.ndarray) -> List[_Unit]:
+        # index du premier token de chaque phrase: tokens terminés avant son début
+        first = np.searchsorted(ends, [s for s, _, _ in spans], side="right").tolist() + [len(ends)]
+        units: List[_Unit] = []
+        for i, (s, e, para) in enumerate(spans):
+            a, n = first[i], first[i + 1] - first[i]
+            if n <= self.chunk_tokens:
+                units.append(_Unit(s, e, n, para))
+                continue
+            # phrase trop longue: morceaux égaux coupés sur des fins de tokens du même flux
+            k = -(-n // self.chunk_tokens)
+            bounds = [a + round(j * n / k) for j in range(k + 1)]
+            cuts = [s] + [min(e, max(s, int(ends[b - 1]))) for b in bounds[1:-1]] + [e]
+            for j in range(k):
+                units.append(_Unit(cuts[j], cuts[j + 1], bounds[j + 1] - bounds[j], para and j == k - 1))
+        return units
+
+    def split_text_spans(self, text: str) -> List[tuple]:
+        """[(début, fin, tokens)] des chunks de `text`."""
+        return self._pack(self._units(self._sentences(text), token_ends([text], self.model)[0]))
+
+    def _pack(self, units: List[_Unit]) -> List[tuple]:
+        # tokens restants jusqu'à la fin du paragraphe, pour chaque phrase
+        para_rest = [0] * len(units)
+        acc = 0
+        for i in range(len(units) - 1, -1, -1):
+            if units[i].para_end:
+                acc = 0
+            acc += units[i].tokens
+            para_rest[i] = acc
+
+        # cible équilibrée: T tokens -> ceil(T / budget) chunks de taille voisine
+        total = sum(u.tokens for u in units)
+        target = -(-total // max(1, -(-total // self.chunk_tokens))) if total else self.chunk_tokens
+
+        out = []
+        cur: List[_Unit] = []
+        cur_n = 0
+        for i, u in enumerate(units):
+            if cur:
+                overflow = cur_n + u.tokens > self.chunk_tokens or (
+                    cur_n >= target * 0.9 and cur_n + u.tokens > target * 1.1)
+                para_break = (cur[-1].para_end and cur_n >= self.chunk_tokens // 2
+                              and cur_n + para_rest[i] > self.chunk_tokens)
+                if overflow or para_break:
+                    out.append((cur[0].start, cur[-1].end, cur_n))
+                    carry: List[_Unit] = []
+                    if overflow and not cur[-1].para_end:
+                        n = 0
+                        for prev in reversed(cur):
+                            if n + prev.tokens > self.overlap_tokens or n + prev.tokens + u.tokens > self.chunk_tokens:
+                                break
+                            carry.insert(0, prev)
+                            n += prev.tokens
+                    cur = carry
+                    cur_n = sum(c.tokens for c in carry)
+            cur.append(u)
+            cur_n += u.tokens
+        if cur:
+            out.append((cur[0].start, cur[-1].end, cur_n))
+        return out
+
+    def split_documents(self, docs: List[Document]) -> List[Document]:
+        # toutes les pages sont tokenisées en un seul lot
+        texts = [d.page_content or "" for d in docs]
+        chunks: List[Document] = []
+        for d, text, ends in zip(docs, texts, token_ends(texts, self.model)):
+            for s, e, _ in self._pack(self._units(self._sentences(text), ends)):
+                meta = dict(d.metadata or {})
+                meta["start_index"] = s
+                chunks.append(Document(page_content=text[s:e], metadata=meta))
+        return chunks
@@ -0,0 +1,61 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+
+from fonctions.chunking import TokenChunker
+from fonctions.mmr import normalize
+
+# Compression extractive du contexte, entre retrieve et l'assemblage du prompt:
+# les phrases de chaque passage texte sont vectorisées en un seul lot (cache d'embeddings)
+# et comparées à la question par un produit matrice-vecteur; on garde les `max_sentences`
+# meilleures de chaque passage, dans leur ordre d'origine. Les métadonnées (pages,
+# quasi-doublons) sont conservées: la citation "(p. X)" reste celle du passage.
+# Les tableaux ne sont pas compressés (lignes liées à l'en-tête).
+
+_GAP = " [...] "
+
+def compress_hits(hits: List[Tuple[Document, float]], qvec: Sequence[float], embeddings: Embeddings,
+                  max_sentences: int = 3) -> Tuple[List[Tuple[Document, float]], Dict[str, Any]]:
+    """(passages compressés, rapport) ; les passages déjà assez courts sont laissés tels quels."""
+    spans: List[List[Tuple[int, int]]] = []
+    sentences: List[str] = []
+    for doc, _ in hits:
+        text = doc.page_content or ""
+        cut = []
+        if (doc.metadata or {}).get("type") not in ("table", "table_flat"):
+            cut = [(s, e) for s, e, _ in TokenChunker._sentences(text)]
+            if len(cut) <= max_sentences:
+                cut = []
+        spans.append(cut)
+        sentences.extend(" ".join(text[s:e].split()) for s, e in cut)
+    report = {"hits": 0, "sentences": len(sentences), "kept": 0,
+              "chars_in": sum(len(d.page_content or "") for d, _ in hits), "chars_out": 0}
+    sims = normalize(embeddings.embed_documents(sentences)) @ normalize(qvec) if sentences else np.zeros(0)
+
+    out: List[Tuple[Document, float]] = []
+    pos = 0
+    for (doc, score), cut in zip(hits, spans):
+        if not cut:
+            out.append((doc, score))
+            continue
+        local = sims[pos:pos + len(cut)]
+        pos += len(cut)
+        keep = np.sort(np.argsort(-local, kind="stable")[:max_sentences])
+        parts, prev = [], -1
+        for i in keep:
+            if parts and i != prev + 1:
+                parts.append(_GAP)
+            elif parts:
+                parts.append(" ")
+            s, e = cut[i]
+            parts.append(" ".join(doc.page_content[s:e].split()))
+            prev = i
+        text = "".join(parts)
+        out.append((Document(page_content=text, metadata=dict(doc.metadata or {}), id=doc.id), score))
+        report["hits"] += 1
+        report["kept"] += len(keep)
+    report["chars_out"] = sum(len(d.page_content or "") for d, _ in out)
+    return out, report
@@ -14,6 +14,17 @@ else:
 DATA_DIR = _here / "data"
 PERSIST_DIR = Path(".chroma")        # unique pour notebook ET app
 COLLECTION_NAME = "pdf_collection"
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").lower()  # chroma | numpy (recherche exacte en mémoire)
+VECTOR_DTYPE = os.getenv("VECTOR_DTYPE", "float32").lower()  # numpy: float32 | float16
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none").lower()  # numpy: none | int8 | binary | matryoshka
+VECTOR_RESCORE_FACTOR = int(os.getenv("VECTOR_RESCORE_FACTOR", "0"))  # candidats re-scorés = k * facteur (0: int8 4, binary 32, matryoshka 8)
+VECTOR_TRUNCATE_DIMS = int(os.getenv("VECTOR_TRUNCATE_DIMS", "256"))  # matryoshka: dimensions du 1er étage
+# état de l'ingestion incrémentale (un par backend: chacun a son propre index)
+MANIFEST_PATH = PERSIST_DIR / ("ingestion_manifest.json" if VECTOR_BACKEND == "chroma"
+                               else f"ingestion_manifest_{VECTOR_BACKEND}.json")
+TABLE_STORE_PATH = PERSIST_DIR / "tables.sqlite"  # cellules des tableaux (raccourci KPI)
+BM25_PATH = PERSIST_DIR / "bm25.sqlite"  # index inversé de la recherche hybride
+CACHE_DIR = Path(os.getenv("CACHE_DIR", ".cache"))  # caches locaux (survivent à un rebuild de .chroma)
 
 # Backends
 EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai").lower()  # openai | hf
@@ -23,16 +34,66 @@ LLM_BACKEND = os.getenv("LLM_BACKEND", "openai").lower()
 OPENAI_EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-large")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 
+# Moteur d'embeddings OpenAI: "langchain" (OpenAIEmbeddings) | "async" (opt-in: lots par tokens, concurrence, rate limit)
+EMBEDDING_ENGINE = os.getenv("EMBEDDING_ENGINE", "langchain").lower()
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "8"))
+EMBEDDING_BATCH_TOKENS = int(os.getenv("EMBEDDING_BATCH_TOKENS", "20000"))
+EMBEDDING_RPM = float(os.getenv("EMBEDDING_RPM", "3000"))
+EMBEDDING_TPM = float(os.getenv("EMBEDDING_TPM", "1000000"))
+
 # (optionnel) HF si jamais tu le veux plus tard
 HF_EMB_MODEL = os.getenv("SENTENCE_TRANSFORMERS_MODEL", "all-MiniLM-L6-v2")
 
+# Cache disque des embeddings (SQLite, LRU)
+EMBEDDING_CACHE = os.getenv("EMBEDDING_CACHE", "true").lower() in ["1", "true", "yes", "on"]
+EMBEDDING_CACHE_PATH = CACHE_DIR / "embeddings.sqlite"
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+
+# Cache sémantique des réponses (questions reformulées -> réponse déjà générée)
+SEMANTIC_CACHE = os.getenv("SEMANTIC_CACHE", "false").lower() in ["1", "true", "yes", "on"]  # opt-in: peut servir la réponse d'une question voisine
+SEMANTIC_CACHE_PATH = CACHE_DIR / "answers.sqlite"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))  # cosinus minimal entre questions
+SEMANTIC_CACHE_TTL_S = float(os.getenv("SEMANTIC_CACHE_TTL_S", "86400"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+
 # Retrieval
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
 CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
+CHUNKER = os.getenv("CHUNKER", "chars").lower()  # chars (LangChain) | tokens (phrases, en tokens du modèle; ré-ingestion)
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "256"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "48"))
+TABLE_CHUNK_TOKENS = int(os.getenv("TABLE_CHUNK_TOKENS", "384"))  # au-delà, tableau découpé en groupes de lignes
 TOP_K = int(os.getenv("TOP_K", "8"))
+RETRIEVAL_TIMEOUT_S = float(os.getenv("RETRIEVAL_TIMEOUT_S", "15"))  # aretrieve: recherche abandonnée au-delà
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "60"))  # délai d'une requête ChatOpenAI
+ANSWER_TIMEOUT_S = float(os.getenv("ANSWER_TIMEOUT_S", "90"))  # aanswer: délai de la requête entière
+APP_CONCURRENCY = int(os.getenv("APP_CONCURRENCY", "256"))  # questions traitées simultanément par app.py
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))  # tokens de passages dans le prompt
+CONTEXT_COMPRESSION = os.getenv("CONTEXT_COMPRESSION", "false").lower() in ["1", "true", "yes", "on"]  # phrases utiles seulement
+COMPRESSION_SENTENCES = int(os.getenv("COMPRESSION_SENTENCES", "3"))  # phrases gardées par passage
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() in ["1", "true", "yes", "on"]  # BM25 + vecteurs (RRF)
+RRF_K = int(os.getenv("RRF_K", "60"))  # constante de la Reciprocal Rank Fusion
+HYBRID_TABLE_SHARE = float(os.getenv("HYBRID_TABLE_SHARE", "0.5"))  # part max. de top_k pour les tableaux en hybride
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "256"))
+NEAR_DUP_DEDUP = os.getenv("NEAR_DUP_DEDUP", "false").lower() in ["1", "true", "yes", "on"]  # opt-in: fusion des chunks quasi identiques d'un PDF
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.9"))  # Jaccard (MinHash) minimal
+
+# Extraction du texte PDF: pypdf | pypdfium2 | pymupdf | pdfplumber
+PDF_TEXT_ENGINE = os.getenv("PDF_TEXT_ENGINE", "pypdf").lower()
+
+# Parsing parallèle (1 = série)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+PAGES_PER_TASK = int(os.getenv("PAGES_PER_TASK", "20"))  # découpage des gros PDF en plages de pages
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "1024"))  # chunks en vol entre parsing et embeddings
 
 # OCR / Tables (facultatif)
 ENABLE_OCR = os.getenv("ENABLE_OCR", "true").lower() in ["1", "true", "yes", "on"]
 OCR_MIN_TEXT_CHARS = int(os.getenv("OCR_MIN_TEXT_CHARS", "120"))
 POPPLER_PATH = os.getenv("POPPLER_PATH", "") or None
 TESSERACT_CMD = os.getenv("TESSERACT_CMD", "") or None
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(max(1, INGEST_WORKERS // 2))))  # tourne en même temps que le pool de parsing
+OCR_CACHE_PATH = CACHE_DIR / "ocr.sqlite"
+TABLE_STORE = os.getenv("TABLE_STORE", "true").lower() in ["1", "true", "yes", "on"]  # index SQLite des cellules (KPI exacts)
+TABLE_PREFILTER = os.getenv("TABLE_PREFILTER", "true").lower() in ["1", "true", "yes", "on"]  # Camelot sur pages candidates
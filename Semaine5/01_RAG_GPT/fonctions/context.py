@@ -0,0 +1,84 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Tuple
+
+from langchain.schema import Document
+
+from fonctions.chunking import TokenChunker
+from fonctions.dedup import occurrence_pages
+from fonctions.tokens import count_tokens
+
+# Assemblage du contexte du prompt sous un budget de tokens (tokenizer du modèle cible):
+# les passages sont pris dans l'ordre des scores; celui qui déborde est raccourci à une
+# frontière de phrase (texte) ou de ligne (tableau, en-tête conservé), puis on s'arrête.
+# La taille du prompt, donc la latence et le coût du LLM, ne dépend plus de top_k.
+
+_MIN_TRIM_TOKENS = 48  # en dessous, un passage tronqué n'apporte plus rien
+_SEP = "\n\n"
+_ELLIPSIS = " ..."
+
+def label(doc: Document) -> str:
+    """Préfixe de citation d'un passage: pages (+ quasi-doublons) et lignes du tableau."""
+    meta = doc.metadata or {}
+    pages = ", ".join(str(p) for p in occurrence_pages(doc)) or meta.get("page")
+    if meta.get("row_start"):
+        return f"(p. {pages}, tableau lignes {meta['row_start']}-{meta['row_end']}/{meta.get('n_rows')})"
+    return f"(p. {pages})"
+
+def _pieces(doc: Document, text: str) -> List[str]:
+    """Unités de coupe: lignes pour un tableau, phrases sinon."""
+    if (doc.metadata or {}).get("type") in ("table", "table_flat"):
+        return [line for line in text.splitlines(keepends=True) if line.strip()]
+    return [text[s:e] for s, e, _ in TokenChunker._sentences(text)]
+
+def _trim(doc: Document, head: str, text: str, budget: int, model: str) -> Tuple[str, int]:
+    """Plus long préfixe de `text` (phrases / lignes entières) qui tient dans `budget` tokens."""
+    pieces = _pieces(doc, text)
+    if not pieces:
+        return "", 0
+    counts = count_tokens([f"{head} "] + pieces + [_ELLIPSIS], model)
+    used = counts[0] + counts[-1]
+    kept: List[str] = []
+    for piece, n in zip(pieces, counts[1:-1]):
+        if used + n > budget:
+            break
+        kept.append(piece)
+        used += n
+    if not kept:
+        return "", 0
+    body = "".join(kept).rstrip() if kept[0].endswith("\n") else " ".join(p.strip() for p in kept)
+    return f"{head} {body}{_ELLIPSIS}", used
+
+def pack_context(hits: List[Tuple[Document, float]], budget: int,
+                 model: str) -> Tuple[str, List[Tuple[Document, float]], Dict[str, Any]]:
+    """(contexte, passages retenus, rapport) pour `hits` dans l'ordre de priorité de `retrieve`."""
+    blocks = [(label(doc), (doc.page_content or "").strip()) for doc, _ in hits]
+    counts = count_tokens([f"{head} {text}" for head, text in blocks] + [_SEP], model)
+    sep = counts[-1]
+    parts: List[str] = []
+    packed: List[Tuple[Document, float]] = []
+    used = trimmed = 0
+    for (doc, score), (head, text), n in zip(hits, blocks, counts):
+        room = budget - used - (sep if parts else 0)
+        full = n <= room
+        if full:
+            block = f"{head} {text}"
+        elif room >= _MIN_TRIM_TOKENS:
+            block, n = _trim(doc, head, text, room, model)
+        else:
+            block = ""
+        if not block:
+            continue  # un passage suivant, plus court, peut encore tenir
+        used += n + (sep if parts else 0)
+        parts.append(block)
+        packed.append((doc, score))
+        if not full:
+            trimmed += 1
+            break  # budget atteint
+    report = {
+        "budget": budget,
+        "tokens": used,
+        "hits": len(packed),
+        "trimmed": trimmed,
+        "dropped": len(hits) - len(packed),
+    }
+    return _SEP.join(parts), packed, report
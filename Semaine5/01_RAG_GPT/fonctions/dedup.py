@@ -0,0 +1,197 @@
+from __future__ import annotations
+import hashlib
+import json
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain.schema import Document
+
+# MinHash + LSH (bandes) pour repérer les chunks quasi identiques d'un même PDF:
+# avertissements, paragraphes et tableaux repris entre synthèse et détail. Comparaison sur le chunk
+# entier: un en-tête / pied de page noyé dans un chunk plus long n'atteint pas le seuil.
+
+_PRIME = np.uint64(4294967291)  # plus grand premier < 2**32
+_WORD = re.compile(r"\w+", re.UNICODE)
+_NUMBER = re.compile(r"\d[\d.,]*(?: ?%)?")
+
+def _shingles(text: str, k: int = 3) -> np.ndarray:
+    """k-grammes de mots (minuscules), hachés sur 32 bits."""
+    words = _WORD.findall(text.lower())
+    if len(words) < k:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + k]) for i in range(len(words) - k + 1)]
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=4).digest(), "little") for g in set(grams)),
+        dtype=np.uint64,
+    )
+
+def _numbers(text: str) -> Tuple[str, ...]:
+    """Valeurs chiffrées du chunk, hors petits entiers (numéros de page, de note...)."""
+    out = []
+    for m in _NUMBER.findall(text):
+        v = m.replace(" ", "").rstrip(".,")
+        if v.isdigit() and len(v) <= 3:
+            continue
+        out.append(v)
+    return tuple(sorted(out))
+
+class NearDupIndex:
+    """Index MinHash/LSH des chunks canoniques d'un PDF.
+
+    Un chunk est un doublon d'un canonique si leur Jaccard estimé (k-grammes de mots)
+    atteint `threshold`, s'ils ont le même type et exactement les mêmes valeurs chiffrées:
+    deux tableaux qui ne diffèrent que par un montant ne sont jamais fusionnés.
+    """
+
+    def __init__(self, threshold: float = 0.9, num_perm: int = 128, bands: int = 32, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm doit être un multiple de bands")
+        rng = np.random.default_rng(seed)
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        # a < 2**31, x < 2**32 -> a*x + b tient sur 64 bits
+        self._a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 31, size=num_perm, dtype=np.uint64)
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = {}
+        self._sigs: List[np.ndarray] = []
+        self._keys: List[Tuple[str, Tuple[str, ...]]] = []
+        self.docs: List[Document] = []
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        sh = _shingles(text)
+        if not sh.size:
+            return None
+        return ((np.outer(sh, self._a) + self._b) % _PRIME).min(axis=0)
+
+    def find(self, doc: Document) -> Tuple[Optional[int], Optional[np.ndarray]]:
+        """(index du canonique quasi identique ou None, signature du chunk)."""
+        sig = self.signature(doc.page_content or "")
+        if sig is None:
+            return None, None
+        key = ((doc.metadata or {}).get("type", "text"), _numbers(doc.page_content or ""))
+        seen = set()
+        for band in range(self.bands):
+            part = sig[band * self.rows:(band + 1) * self.rows].tobytes()
+            for i in self._buckets.get((band, part), ()):
+                if i in seen:
+                    continue
+                seen.add(i)
+                if self._keys[i] == key and np.mean(self._sigs[i] == sig) >= self.threshold:
+                    return i, sig
+        return None, sig
+
+    def add(self, doc: Document, sig: Optional[np.ndarray]) -> int:
+        i = len(self.docs)
+        self.docs.append(doc)
+        if sig is not None:
+            self._sigs.append(sig)
+            self._keys.append(((doc.metadata or {}).get("type", "text"), _numbers(doc.page_content or "")))
+            for band in range(self.bands):
+                part = sig[band * self.rows:(band + 1) * self.rows].tobytes()
+                self._buckets.setdefault((band, part), []).append(i)
+        else:
+            self._sigs.append(np.zeros(self.rows * self.bands, dtype=np.uint64))
+            self._keys.append(("", ()))
+        return i
+
+def occurrences(doc: Document) -> List[Dict[str, object]]:
+    """Occurrences (source, page) d'un chunk; un chunk non fusionné n'a que la sienne."""
+    meta = doc.metadata or {}
+    raw = meta.get("occurrences")
+    if raw:
+        try:
+            return json.loads(raw)
+        except (TypeError, ValueError):
+            pass
+    return [{"source": meta.get("source"), "page": meta.get("page")}]
+
+def add_occurrence(canonical: Document, dup: Document) -> bool:
+    """Ajoute la position de `dup` au canonique (metadata JSON, Chroma n'accepte que des scalaires)."""
+    occ = occurrences(canonical)
+    meta = dup.metadata or {}
+    new = {"source": meta.get("source"), "page": meta.get("page")}
+    if new in occ:
+        return False
+    occ.append(new)
+    canonical.metadata["occurrences"] = json.dumps(occ, ensure_ascii=False)
+    canonical.metadata["n_occurrences"] = len(occ)
+    return True
+
+def occurrence_pages(doc: Document) -> List[int]:
+    return sorted({o["page"] for o in occurrences(doc) if o.get("page") is not None})
+
+# --- Fusion des passages renvoyés par la recherche ---
+
+def content_hash(text: str) -> str:
+    """Empreinte du texte aux espaces près (doublons exacts entre collections / backends)."""
+    return hashlib.sha1(" ".join((text or "").split()).encode("utf-8")).hexdigest()
+
+def _span(doc: Document) -> Optional[Tuple[int, int]]:
+    start = (doc.metadata or {}).get("start_index")
+    if not isinstance(start, int) or start < 0:
+        return None
+    return start, start + len(doc.page_content or "")
+
+def merge_hits(hits: List[Tuple[Document, float]], max_gap: int = 3) -> List[Tuple[Document, float]]:
+    """Supprime les doublons exacts (hash, pages conservées en occurrences) et fusionne les passages d'une même page qui se
+    recouvrent (CHUNK_OVERLAP) ou se touchent (écart <= max_gap caractères) en un seul bloc,
+    recouvrement retiré. Score d'un bloc = meilleur score de ses passages; ordre = score décroissant.
+    Métadonnées du bloc: celles de son meilleur passage + `start_index`, `end_index`, `merged`.
+    """
+    unique: Dict[str, Tuple[Document, float]] = {}
+    for doc, score in hits:
+        key = content_hash(doc.page_content)
+        if key not in unique:
+            unique[key] = (doc, score)
+            continue
+        prev, prev_score = unique[key]
+        keep, other, best = (doc, prev, score) if score > prev_score else (prev, doc, prev_score)
+        keep.metadata = dict(keep.metadata or {})
+        for occ in occurrences(other):  # même texte sur une autre page: page citée en plus
+            add_occurrence(keep, Document(page_content="", metadata=occ))
+        unique[key] = (keep, best)
+
+    groups: Dict[tuple, List[Tuple[Document, float]]] = {}
+    out: List[Tuple[Document, float]] = []
+    for doc, score in unique.values():
+        meta = doc.metadata or {}
+        if _span(doc) is None or meta.get("type") in ("table", "table_flat"):
+            out.append((doc, score))  # tableaux: groupes de lignes à en-tête répété, pas de fusion
+            continue
+        groups.setdefault((meta.get("source"), meta.get("page"), meta.get("type")), []).append((doc, score))
+
+    for members in groups.values():
+        members.sort(key=lambda h: _span(h[0]))
+        block = [members[0]]
+        text = members[0][0].page_content or ""
+        start, end = _span(members[0][0])
+        for doc, score in members[1:] + [(None, 0.0)]:
+            if doc is not None:
+                s, e = _span(doc)
+                body = doc.page_content or ""
+                cut = end - s
+                if e <= end and text[s - start:e - start] == body:
+                    block.append((doc, score))  # déjà contenu dans le bloc
+                    continue
+                if cut >= 0 and (cut == 0 or text.endswith(body[:cut])):
+                    text, end = text + body[cut:], max(end, e)  # recouvrement retiré
+                    block.append((doc, score))
+                    continue
+                if -max_gap <= cut < 0:
+                    # passages contigus: un espace par caractère manquant, len(text) == end - start
+                    text, end = text + " " * -cut + body, e
+                    block.append((doc, score))
+                    continue
+            best_doc, best = max(block, key=lambda h: h[1])
+            if len(block) == 1:
+                out.append((best_doc, best))
+            else:
+                meta = {**(best_doc.metadata or {}), "start_index": start, "end_index": end, "merged": len(block)}
+                out.append((Document(page_content=text, metadata=meta, id=best_doc.id), best))
+            if doc is not None:
+                block, text, (start, end) = [(doc, score)], doc.page_content or "", _span(doc)
+    out.sort(key=lambda h: h[1], reverse=True)
+    return out
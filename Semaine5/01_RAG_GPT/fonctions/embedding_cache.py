@@ -0,0 +1,132 @@
+from __future__ import annotations
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class CachedEmbeddings(Embeddings):
+    """Cache disque (SQLite) devant un modèle d'embeddings LangChain.
+
+    Clé = sha256(backend | modèle | dimensions | texte): un texte déjà vectorisé
+    (chunk inchangé, question répétée) ne coûte plus aucun appel API.
+    Éviction LRU au-delà de `max_entries`.
+    """
+
+    def __init__(self, inner: Embeddings, backend: str, model: str, path: Path,
+                 max_entries: int = 200_000, dimensions: Optional[int] = None):
+        self.inner = inner
+        self.namespace = f"{backend}|{model}|{dimensions or ''}"
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, vec BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_emb_access ON embeddings(last_access)")
+        self._db.commit()
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.namespace}|{text}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        uniq = list(dict.fromkeys(keys))
+        for i in range(0, len(uniq), 500):  # limite de variables SQLite
+            part = uniq[i:i + 500]
+            rows = self._db.execute(
+                f"SELECT key, vec FROM embeddings WHERE key IN ({','.join('?' * len(part))})", part
+            ).fetchall()
+            for k, blob in rows:
+                found[k] = np.frombuffer(blob, dtype=np.float32).tolist()
+        if found:
+            now = time.time()
+            self._db.executemany("UPDATE embeddings SET last_access=? WHERE key=?", [(now, k) for k in found])
+        return found
+
+    def _store(self, items: Dict[str, List[float]]) -> None:
+        now = time.time()
+        self._db.executemany(
+            "INSERT OR REPLACE INTO embeddings(key, vec, last_access) VALUES (?, ?, ?)",
+            [(k, np.asarray(v, dtype=np.float32).tobytes(), now) for k, v in items.items()],
+        )
+        (count,) = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        if count > self.max_entries:
+            self._db.execute(
+                "DELETE FROM embeddings WHERE key IN ("
+                " SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def _fetch(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Vecteurs déjà en cache pour `keys`; compteurs hits / misses mis à jour sous le verrou."""
+        with self._lock:
+            found = self._lookup(keys)
+            self._db.commit()
+            n_hits = sum(1 for k in keys if k in found)
+            self.hits += n_hits
+            self.misses += len(keys) - n_hits
+        return found
+
+    def _save(self, keys: List[str], vectors: List[List[float]]) -> Dict[str, List[float]]:
+        # arrondi float32 comme en base: même vecteur au 1er appel et depuis le cache
+        computed = {k: np.asarray(v, dtype=np.float32).tolist() for k, v in zip(keys, vectors)}
+        with self._lock:
+            self._store(computed)
+            self._db.commit()
+        return computed
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(t) for t in texts]
+        found = self._fetch(keys)
+        missing = {k: t for k, t in zip(keys, texts) if k not in found}  # dédoublonné
+        if missing:
+            found.update(self._save(list(missing), self.inner.embed_documents(list(missing.values()))))
+        return [list(found[k]) for k in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        found = self._fetch([key])
+        if key not in found:
+            found.update(self._save([key], [self.inner.embed_query(text)]))
+        return found[key]
+
+    # versions async: lecture / écriture SQLite dans un thread, la boucle n'attend que l'API
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(t) for t in texts]
+        found = await asyncio.to_thread(self._fetch, keys)
+        missing = {k: t for k, t in zip(keys, texts) if k not in found}
+        if missing:
+            vectors = await self.inner.aembed_documents(list(missing.values()))
+            found.update(await asyncio.to_thread(self._save, list(missing), vectors))
+        return [list(found[k]) for k in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        found = await asyncio.to_thread(self._fetch, [key])
+        if key not in found:
+            found.update(await asyncio.to_thread(self._save, [key], [await self.inner.aembed_query(text)]))
+        return found[key]
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            (entries,) = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+            "entries": entries,
+        }
@@ -0,0 +1,265 @@
+from __future__ import annotations
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.embeddings import Embeddings
+
+MAX_INPUT_TOKENS = 8191  # limite par texte des modèles text-embedding-3
+
+
+class _TokenBucket:
+    """Seau à jetons par minute (requêtes ou tokens). Utilisé depuis une seule boucle asyncio.
+
+    Le débit est adaptatif: divisé par 2 sur un 429, puis remonte de 10 % par succès.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.max_rate = self.rate
+        self.t = time.monotonic()
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        amount = min(float(amount), self.capacity)
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.t) * self.rate)
+            self.t = now
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return
+            await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def slow_down(self) -> None:
+        self.rate = max(self.max_rate / 100.0, self.rate * 0.5)
+        self.tokens = min(self.tokens, 1.0)  # pas de rafale juste après un 429
+
+    def speed_up(self) -> None:
+        self.rate = min(self.max_rate, self.rate * 1.1)
+
+
+class _AdaptiveLimiter:
+    """Concurrence AIMD: divisée par 2 sur un 429, +1 après `limit` succès."""
+
+    def __init__(self, max_limit: int):
+        self.max_limit = max(1, max_limit)
+        self.limit = self.max_limit
+        self.active = 0
+        self._credit = 0.0
+        self._cond = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+
+    async def __aexit__(self, *exc):
+        async with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+    def on_success(self) -> None:
+        self._credit += 1.0 / self.limit
+        if self._credit >= 1.0 and self.limit < self.max_limit:
+            self._credit = 0.0
+            self.limit += 1
+
+    def on_throttle(self) -> None:
+        self.limit = max(1, self.limit // 2)
+        self._credit = 0.0
+
+
+class AsyncEmbeddingEngine(Embeddings):
+    """Moteur d'embeddings OpenAI asynchrone, compatible LangChain.
+
+    - lots construits par budget de tokens (et non par nombre fixe de textes);
+    - N requêtes concurrentes, réduites automatiquement en cas de 429;
+    - respect des limites RPM/TPM (seaux à jetons) et backoff (Retry-After ou exponentiel);
+    - textes identiques dédoublonnés avant envoi.
+
+    Toutes les requêtes passent par une boucle asyncio dédiée (thread de fond), ce qui
+    rend l'API synchrone utilisable partout (Chroma, notebook, handlers Gradio async).
+    `base_url` permet de viser un serveur local (cf. benchmarks/fake_embedding_server.py).
+    """
+
+    def __init__(
+        self,
+        model: str,
+        dimensions: Optional[int] = None,
+        concurrency: int = 8,
+        max_batch_tokens: int = 20_000,
+        max_batch_size: int = 2048,
+        rpm: float = 3_000,
+        tpm: float = 1_000_000,
+        max_retries: int = 8,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        timeout: float = 60.0,
+    ):
+        self.model = model
+        self.dimensions = dimensions
+        self.concurrency = concurrency
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_retries = max_retries
+        self._client_kwargs = {"base_url": base_url, "api_key": api_key, "timeout": timeout, "max_retries": 0}
+        self._encoding = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+        self.stats: Dict[str, float] = {
+            "texts": 0, "unique_texts": 0, "tokens": 0, "requests": 0,
+            "throttled": 0, "retries": 0, "seconds": 0.0,
+        }
+
+    # --- boucle dédiée ---
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="embedding-engine", daemon=True).start()
+                self._loop = loop
+                asyncio.run_coroutine_threadsafe(self._setup(), loop).result()
+            return self._loop
+
+    async def _setup(self) -> None:
+        from openai import AsyncOpenAI
+        kwargs = {k: v for k, v in self._client_kwargs.items() if v is not None}
+        self._client = AsyncOpenAI(**kwargs)
+        self._limiter = _AdaptiveLimiter(self.concurrency)
+        self._rpm = _TokenBucket(self.rpm)
+        self._tpm = _TokenBucket(self.tpm)
+        self._pause_until = 0.0
+
+    # --- tokens ---
+
+    def _count_tokens(self, texts: Sequence[str]) -> List[int]:
+        if self._encoding is None:
+            try:
+                import tiktoken
+                self._encoding = tiktoken.encoding_for_model(self.model)
+            except Exception:
+                self._encoding = False  # hors-ligne / modèle inconnu -> estimation
+        if self._encoding:
+            return [len(ids) for ids in self._encoding.encode_ordinary_batch(list(texts))]
+        return [len(t) // 4 + 1 for t in texts]
+
+    def _truncate(self, text: str, n_tokens: int) -> str:
+        if n_tokens <= MAX_INPUT_TOKENS or not self._encoding:
+            return text
+        return self._encoding.decode(self._encoding.encode_ordinary(text)[:MAX_INPUT_TOKENS])
+
+    def _make_batches(self, texts: List[str], counts: List[int]) -> List[List[int]]:
+        batches: List[List[int]] = []
+        cur: List[int] = []
+        cur_tokens = 0
+        for i, n in enumerate(counts):
+            n = min(n, MAX_INPUT_TOKENS)
+            if cur and (cur_tokens + n > self.max_batch_tokens or len(cur) >= self.max_batch_size):
+                batches.append(cur)
+                cur, cur_tokens = [], 0
+            cur.append(i)
+            cur_tokens += n
+        if cur:
+            batches.append(cur)
+        return batches
+
+    # --- requêtes ---
+
+    async def _request(self, inputs: List[str], n_tokens: int) -> List[List[float]]:
+        import openai
+        attempt = 0
+        while True:
+            delay = self._pause_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self._rpm.acquire(1)
+            await self._tpm.acquire(n_tokens)
+            async with self._limiter:
+                try:
+                    kwargs: Dict[str, Any] = {"model": self.model, "input": inputs}
+                    if self.dimensions:
+                        kwargs["dimensions"] = self.dimensions
+                    resp = await self._client.embeddings.create(**kwargs)
+                    self.stats["requests"] += 1
+                    self._limiter.on_success()
+                    self._rpm.speed_up()
+                    return [d.embedding for d in sorted(resp.data, key=lambda d: d.index)]
+                except openai.RateLimitError as e:
+                    self.stats["throttled"] += 1
+                    if time.monotonic() >= self._pause_until:  # une seule réaction par salve de 429
+                        self._limiter.on_throttle()
+                        self._rpm.slow_down()
+                    retry_after = _retry_after(e)
+                    err: Exception = e
+                except (openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError) as e:
+                    retry_after = None
+                    err = e
+            attempt += 1
+            if attempt > self.max_retries:
+                raise err
+            self.stats["retries"] += 1
+            wait = max(retry_after or 0.0, min(60.0, 0.25 * 2 ** attempt))
+            wait *= 1.0 + 0.25 * random.random()  # jitter
+            self._pause_until = max(self._pause_until, time.monotonic() + wait)  # pause globale
+
+    async def _embed(self, texts: List[str]) -> List[List[float]]:
+        t0 = time.perf_counter()
+        uniq = list(dict.fromkeys(texts))
+        counts = self._count_tokens(uniq)
+        inputs = [self._truncate(t, n) for t, n in zip(uniq, counts)]
+        batches = self._make_batches(inputs, counts)
+        results = await asyncio.gather(*[
+            self._request([inputs[i] for i in b], sum(min(counts[i], MAX_INPUT_TOKENS) for i in b))
+            for b in batches
+        ])
+        by_text: Dict[str, List[float]] = {}
+        for b, vectors in zip(batches, results):
+            for i, v in zip(b, vectors):
+                by_text[uniq[i]] = v
+        self.stats["texts"] += len(texts)
+        self.stats["unique_texts"] += len(uniq)
+        self.stats["tokens"] += sum(counts)
+        self.stats["seconds"] += time.perf_counter() - t0
+        return [by_text[t] for t in texts]
+
+    # --- API LangChain ---
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return asyncio.run_coroutine_threadsafe(self._embed(list(texts)), self._ensure_loop()).result()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        fut = asyncio.run_coroutine_threadsafe(self._embed(list(texts)), self._ensure_loop())
+        return await asyncio.wrap_future(fut)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+    def throughput(self) -> Dict[str, float]:
+        s = self.stats["seconds"] or 1e-9
+        return {
+            "texts_per_s": round(self.stats["texts"] / s, 1),
+            "tokens_per_s": round(self.stats["tokens"] / s, 1),
+            **self.stats,
+        }
+
+
+def _retry_after(err: Exception) -> Optional[float]:
+    try:
+        value = err.response.headers.get("retry-after")  # type: ignore[attr-defined]
+        return float(value) if value is not None else None
+    except Exception:
+        return None
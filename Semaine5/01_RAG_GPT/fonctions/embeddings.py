@@ -1,9 +1,23 @@
-from fonctions.config import OPENAI_EMBEDDING_MODEL, EMBEDDING_BACKEND, HF_EMB_MODEL
+from fonctions.config import (
+    OPENAI_EMBEDDING_MODEL, EMBEDDING_BACKEND, HF_EMB_MODEL,
+    EMBEDDING_CACHE, EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES,
+    EMBEDDING_ENGINE, EMBEDDING_CONCURRENCY, EMBEDDING_BATCH_TOKENS, EMBEDDING_RPM, EMBEDDING_TPM,
+)
 from langchain_openai import OpenAIEmbeddings
 
-# Optionnel : support HF si tu repasses dessus plus tard
-def get_embedding():
+_CACHED = None  # une seule instance par process: compteurs hit/miss partagés
+
+def _get_raw_embedding():
     if EMBEDDING_BACKEND == "openai":
+        if EMBEDDING_ENGINE == "async":
+            from fonctions.embedding_engine import AsyncEmbeddingEngine
+            return AsyncEmbeddingEngine(
+                model=OPENAI_EMBEDDING_MODEL,
+                concurrency=EMBEDDING_CONCURRENCY,
+                max_batch_tokens=EMBEDDING_BATCH_TOKENS,
+                rpm=EMBEDDING_RPM,
+                tpm=EMBEDDING_TPM,
+            )
         return OpenAIEmbeddings(model=OPENAI_EMBEDDING_MODEL)
     # fallback HF (évite l'erreur si jamais la var change)
     from langchain_huggingface import HuggingFaceEmbeddings
@@ -11,3 +25,21 @@ def get_embedding():
         model_name=HF_EMB_MODEL,
         encode_kwargs={"normalize_embeddings": True},
     )
+
+# Optionnel : support HF si tu repasses dessus plus tard
+def get_embedding():
+    global _CACHED
+    if not EMBEDDING_CACHE:
+        return _get_raw_embedding()
+    if _CACHED is None:
+        from fonctions.embedding_cache import CachedEmbeddings
+        inner = _get_raw_embedding()
+        _CACHED = CachedEmbeddings(
+            inner,
+            backend=EMBEDDING_BACKEND,
+            model=OPENAI_EMBEDDING_MODEL if EMBEDDING_BACKEND == "openai" else HF_EMB_MODEL,
+            path=EMBEDDING_CACHE_PATH,
+            max_entries=EMBEDDING_CACHE_MAX_ENTRIES,
+            dimensions=getattr(inner, "dimensions", None),
+        )
+    return _CACHED
@@ -1,15 +1,38 @@
 from __future__ import annotations
+import csv
+import hashlib
+import io
+import json
 import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 
-from fonctions.config import DATA_DIR, PERSIST_DIR, COLLECTION_NAME, CHUNK_SIZE, CHUNK_OVERLAP
-from fonctions.embeddings import get_embedding
+from fonctions.config import (
+    DATA_DIR, PERSIST_DIR, CHUNK_SIZE, CHUNK_OVERLAP, MANIFEST_PATH, UPSERT_BATCH_SIZE,
+    CHUNKER, CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS, TABLE_CHUNK_TOKENS, OPENAI_MODEL, NEAR_DUP_DEDUP, NEAR_DUP_THRESHOLD,
+    INGEST_WORKERS, PAGES_PER_TASK, INGEST_QUEUE_SIZE,
+    ENABLE_OCR, OCR_MIN_TEXT_CHARS, OCR_DPI, OCR_LANG, TABLE_PREFILTER, PDF_TEXT_ENGINE,
+    TABLE_STORE, TABLE_STORE_PATH, HYBRID_SEARCH, BM25_PATH,
+    EMBEDDING_BACKEND, OPENAI_EMBEDDING_MODEL, HF_EMB_MODEL,
+)
+from fonctions.bm25 import BM25Index
+from fonctions.chunking import TokenChunker
+from fonctions.dedup import NearDupIndex, add_occurrence
+from fonctions.retrieval import get_vectorstore
+from fonctions.ocr import OcrStage, ocr_available
+from fonctions.pdf_text import extract_text_docs
+from fonctions.table_detection import detect_table_pages
+from fonctions.table_store import TableStore
+from fonctions.tokens import count_tokens
 
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFLoader
 from langchain.schema import Document
-from langchain_chroma import Chroma
+from langchain_core.vectorstores import VectorStore
 
 # --- Helpers ---
 
@@ -17,78 +40,547 @@ def _list_pdfs() -> List[Path]:
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     return sorted(DATA_DIR.glob("*.pdf"))
 
-def _load_text_docs(pdf_path: Path) -> List[Document]:
-    loader = PyPDFLoader(str(pdf_path))
-    docs = loader.load()  # chaque page = 1 Document, avec metadata 'source' et 'page'
-    for d in docs:
-        d.metadata = d.metadata or {}
-        d.metadata.setdefault("type", "text")  # on marque texte
-    return docs
+def _page_count(pdf_path: Path) -> int:
+    from pypdf import PdfReader
+    return len(PdfReader(str(pdf_path)).pages)
+
+def _load_text_docs(pdf_path: Path, pages: Optional[Tuple[int, int]] = None) -> List[Document]:
+    """Texte page par page (moteur PDF_TEXT_ENGINE). `pages` = plage [début, fin) 0-based, None = tout le PDF."""
+    return extract_text_docs(pdf_path, pages)  # chaque page = 1 Document: source, page, type="text"
+
+def _read_tables(camelot, pdf_path: Path, pages: str, flavors: Tuple[str, ...]):
+    """Camelot avec repli sur la saveur suivante si erreur ou aucun tableau."""
+    for flavor in flavors:
+        try:
+            tables = camelot.read_pdf(str(pdf_path), pages=pages, flavor=flavor)
+        except Exception:
+            continue
+        if tables.n:
+            return list(tables)
+    return []
 
-def _load_tables_docs(pdf_path: Path) -> List[Document]:
-    """Essaie d'extraire des tableaux avec Camelot. Si indisponible, renvoie []."""
+def _load_tables_docs(pdf_path: Path, pages: Optional[Tuple[int, int]] = None) -> List[Document]:
+    """Essaie d'extraire des tableaux avec Camelot. Si indisponible, renvoie [].
+
+    Avec TABLE_PREFILTER, une passe rapide sur la couche texte choisit les pages
+    candidates et Camelot ne tourne que sur celles-ci, page par page, avec repli
+    lattice <-> stream par page. `pages` = plage [début, fin) 0-based, None = tout le PDF.
+    """
     try:
         import camelot  # nécessite ghostscript/opencv selon OS
     except Exception:
         return []
-    try:
-        tables = camelot.read_pdf(str(pdf_path), pages="all", flavor="lattice")
-    except Exception:
+
+    tables = []
+    candidates: Optional[Dict[int, str]] = None
+    if TABLE_PREFILTER:
+        try:
+            candidates = detect_table_pages(pdf_path, pages)
+        except Exception:
+            candidates = None  # détection impossible -> comportement historique
+    if candidates is not None:
+        for page, flavor in sorted(candidates.items()):
+            other = "stream" if flavor == "lattice" else "lattice"
+            tables.extend(_read_tables(camelot, pdf_path, str(page), (flavor, other)))
+    else:
+        camelot_pages = "all" if pages is None else f"{pages[0] + 1}-{pages[1]}"  # Camelot: 1-based inclusif
         try:
-            tables = camelot.read_pdf(str(pdf_path), pages="all", flavor="stream")
+            tables = list(camelot.read_pdf(str(pdf_path), pages=camelot_pages, flavor="lattice"))
         except Exception:
-            return []
+            try:
+                tables = list(camelot.read_pdf(str(pdf_path), pages=camelot_pages, flavor="stream"))
+            except Exception:
+                return []
 
     docs: List[Document] = []
     for t in tables:
-        text = t.df.to_csv(index=False)  # table -> csv texte (lisible pour le LLM)
+        text = t.df.to_csv(index=False, header=False)  # table -> csv texte (lisible pour le LLM), 1re ligne = en-tête
         meta = {
             "source": str(pdf_path),
-            "page": t.page,              # camelot renvoie page
+            "page": int(t.page) - 1,     # Camelot: 1-based -> 0-based comme les pages de texte
             "type": "table_flat",
         }
         docs.append(Document(page_content=text, metadata=meta))
     return docs
 
-def _split_docs(docs: List[Document]) -> List[Document]:
-    splitter = RecursiveCharacterTextSplitter(
+# --- Parsing parallèle ---
+
+def _parse_task(task: Tuple[str, Optional[Tuple[int, int]]]) -> Tuple[List[Document], List[Document], float]:
+    """Worker (process pool): texte + tableaux d'un PDF ou d'une plage de pages."""
+    pdf, pages = task
+    t0 = time.perf_counter()
+    text_docs = _load_text_docs(Path(pdf), pages)
+    table_docs = _load_tables_docs(Path(pdf), pages)  # peut être vide si Camelot indisponible
+    return text_docs, table_docs, time.perf_counter() - t0
+
+def _plan_tasks(pdf: Path, pages_per_task: int) -> List[Tuple[str, Optional[Tuple[int, int]]]]:
+    try:
+        n = _page_count(pdf)
+    except Exception:
+        n = 0
+    if n <= pages_per_task:
+        return [(str(pdf), None)]
+    return [(str(pdf), (s, min(s + pages_per_task, n))) for s in range(0, n, pages_per_task)]
+
+def _parse_pdfs(
+    pdfs: List[Path],
+    workers: int = INGEST_WORKERS,
+    pages_per_task: int = PAGES_PER_TASK,
+) -> Tuple[Dict[str, List[Document]], Dict[str, Any]]:
+    """Parse les PDF (séquentiel si workers <= 1, sinon process pool).
+
+    Le résultat est fusionné dans un ordre déterministe, identique au mode série:
+    pour chaque PDF, le texte de toutes ses pages puis ses tableaux.
+    Les stats comparent le temps mur au temps cumulé des tâches (= coût série estimé).
+    Matérialise tout le corpus: réservé aux benchmarks, l'ingestion passe par `_iter_chunks`.
+    """
+    t0 = time.perf_counter()
+    tasks = [t for pdf in pdfs for t in _plan_tasks(pdf, pages_per_task)]
+    text: Dict[str, List[Document]] = {str(p): [] for p in pdfs}
+    tables: Dict[str, List[Document]] = {str(p): [] for p in pdfs}
+    serial_s = 0.0
+    for (pdf, _), (text_docs, table_docs, dt) in _iter_parsed(tasks, workers):
+        text[pdf].extend(text_docs)
+        tables[pdf].extend(table_docs)
+        serial_s += dt
+    return {p: text[p] + tables[p] for p in text}, _parse_stats(tasks, workers, serial_s, t0)
+
+def _iter_parsed(tasks: List[Tuple[str, Optional[Tuple[int, int]]]], workers: int) -> Iterator[Tuple[Any, Any]]:
+    """Résultats des tâches dans l'ordre, avec au plus 2*workers tâches en vol (mémoire bornée)."""
+    if workers <= 1 or len(tasks) <= 1:
+        for t in tasks:
+            yield t, _parse_task(t)
+        return
+    it = iter(tasks)
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        pending = deque()
+        for t in it:
+            pending.append((t, pool.submit(_parse_task, t)))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            t, fut = pending.popleft()
+            res = fut.result()
+            nxt = next(it, None)
+            if nxt is not None:
+                pending.append((nxt, pool.submit(_parse_task, nxt)))
+            yield t, res
+
+def _parse_stats(tasks: List[Any], workers: int, serial_s: float, t0: float) -> Dict[str, Any]:
+    wall_s = time.perf_counter() - t0
+    return {
+        "workers": max(1, min(workers, len(tasks))),
+        "tasks": len(tasks),
+        "wall_s": round(wall_s, 3),
+        "serial_s": round(serial_s, 3),
+        "speedup": round(serial_s / wall_s, 2) if wall_s > 0 and serial_s > 0 else 1.0,
+    }
+
+def _make_splitter(chunker: str = CHUNKER) -> Union[TokenChunker, RecursiveCharacterTextSplitter]:
+    if chunker == "tokens":
+        return TokenChunker(CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS, model=OPENAI_MODEL)
+    return RecursiveCharacterTextSplitter(
         chunk_size=CHUNK_SIZE,
         chunk_overlap=CHUNK_OVERLAP,
         separators=["\n\n", "\n", " ", ""],
+        add_start_index=True,
     )
+
+def _csv_rows(text: str) -> List[List[str]]:
+    return [r for r in csv.reader(io.StringIO(text)) if any(c.strip() for c in r)]
+
+def _csv_text(rows: List[List[str]]) -> str:
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator="\n").writerows(rows)
+    return buf.getvalue()
+
+def _split_table(doc: Document, max_tokens: int = TABLE_CHUNK_TOKENS) -> List[Document]:
+    """Découpe un grand tableau CSV en groupes de lignes, en-tête répété dans chaque groupe.
+
+    Les groupes sont équilibrés (ceil(T/budget) groupes de tailles voisines) et reliés au
+    tableau d'origine par `parent_table_id`; `row_start`/`row_end` = lignes de données
+    (1-based, en-tête exclu). Un tableau qui tient dans le budget reste entier.
+    """
+    rows = _csv_rows(doc.page_content or "")
+    if len(rows) < 3:
+        return [doc]
+    header, body = rows[0], rows[1:]
+    head_tokens, *row_tokens = count_tokens([_csv_text([r]) for r in rows], OPENAI_MODEL)
+    total = head_tokens + sum(row_tokens)
+    if total <= max_tokens:
+        return [doc]
+    n_groups = min(len(body), -(-sum(row_tokens) // max(1, max_tokens - head_tokens)))
+    target = sum(row_tokens) / n_groups
+    parent_id = _chunk_id(doc)
+    groups: List[Tuple[int, int]] = []
+    start, acc = 0, 0
+    for i, n in enumerate(row_tokens):
+        if i > start and (acc + n > max_tokens - head_tokens or acc >= target):
+            groups.append((start, i))
+            start, acc = i, 0
+        acc += n
+    groups.append((start, len(body)))
+    out: List[Document] = []
+    for a, b in groups:
+        meta = dict(doc.metadata or {})
+        meta.update({
+            "parent_table_id": parent_id,
+            "row_start": a + 1,
+            "row_end": b,
+            "n_rows": len(body),
+        })
+        out.append(Document(page_content=_csv_text([header] + body[a:b]), metadata=meta))
+    return out
+
+def _split_docs(docs: List[Document], splitter: Optional[Union[TokenChunker, RecursiveCharacterTextSplitter]] = None) -> List[Document]:
+    """Chunks des pages de texte (un seul appel au splitter: TokenChunker tokenise tout en un lot), puis des tableaux."""
+    splitter = splitter or _make_splitter()
+    texts = [d for d in docs if (d.metadata or {}).get("type") not in ("table", "table_flat")]
     chunks: List[Document] = []
+    for c in splitter.split_documents(texts) if texts else []:
+        c.metadata = c.metadata or {}
+        c.metadata.setdefault("type", "text")
+        chunks.append(c)
     for d in docs:
-        # ne pas re-splitter les tables CSV déjà concises
+        # tableaux: pas de découpe texte, mais groupes de lignes si trop grands
         if (d.metadata or {}).get("type") in ("table", "table_flat"):
-            chunks.append(d)
-        else:
-            for c in splitter.split_documents([d]):
-                c.metadata = c.metadata or {}
-                c.metadata.setdefault("type", "text")
-                chunks.append(c)
+            chunks.extend(_split_table(d))
     return chunks
 
+# --- Pipeline en streaming (mémoire bornée) ---
+
+_FILE_END = None  # marqueur de fin de PDF dans le flux de chunks
+
+def _apply_ocr(ocr: OcrStage, pdf: str, file_hash: str, text_docs: List[Document]) -> None:
+    """Remplace le texte des pages quasi vides (< OCR_MIN_TEXT_CHARS) par leur OCR."""
+    scanned = {
+        d.metadata.get("page"): d
+        for d in text_docs
+        if len((d.page_content or "").strip()) < OCR_MIN_TEXT_CHARS and d.metadata.get("page") is not None
+    }
+    for page, text in ocr.ocr_pages(pdf, file_hash, sorted(scanned)).items():
+        doc = scanned[page]
+        if len(text.strip()) > len((doc.page_content or "").strip()):
+            doc.page_content = text
+            doc.metadata["ocr"] = True
+
+def _iter_chunks(
+    tasks: List[Tuple[str, Optional[Tuple[int, int]]]],
+    workers: int,
+    stats: Dict[str, float],
+    hashes: Optional[Dict[str, str]] = None,
+) -> Iterator[Tuple[str, Optional[Document]]]:
+    """page -> (OCR) -> chunks, au fil de l'eau. Émet (source, _FILE_END) quand un PDF est terminé."""
+    splitter = _make_splitter()
+    current = None
+    ocr = OcrStage() if ENABLE_OCR and ocr_available() else None
+    try:
+        for (pdf, _), (text_docs, table_docs, dt) in _iter_parsed(tasks, workers):
+            stats["serial_s"] += dt
+            if current is not None and pdf != current:
+                yield current, _FILE_END
+            current = pdf
+            if ocr is not None:
+                file_hash = (hashes or {}).get(pdf) or _file_sha256(Path(pdf))
+                _apply_ocr(ocr, pdf, file_hash, text_docs)
+            for chunk in _split_docs(text_docs + table_docs, splitter):  # <= PAGES_PER_TASK pages
+                yield pdf, chunk
+        if current is not None:
+            yield current, _FILE_END
+    finally:
+        if ocr is not None:
+            stats["ocr_pages"] = ocr.stats["ocr"]
+            stats["ocr_cached"] = ocr.stats["cached"]
+            ocr.close()
+
+def _prefetch(items: Iterable[Any], maxsize: int) -> Iterator[Any]:
+    """Exécute `items` dans un thread producteur, via une file bornée (backpressure)."""
+    q: "queue.Queue[Tuple[str, Any]]" = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def _put(kind: str, value: Any) -> bool:
+        while not stop.is_set():
+            try:
+                q.put((kind, value), timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run() -> None:
+        try:
+            for item in items:
+                if not _put("item", item):
+                    return
+            _put("end", None)
+        except BaseException as e:  # remonté côté consommateur
+            _put("error", e)
+
+    th = threading.Thread(target=_run, name="ingest-producer", daemon=True)
+    th.start()
+    try:
+        while True:
+            kind, value = q.get()
+            if kind == "end":
+                return
+            if kind == "error":
+                raise value
+            yield value
+    finally:
+        stop.set()
+
+# --- IDs déterministes + upsert ---
+
+def _chunk_id(doc: Document) -> str:
+    """ID stable: (source, page, type, hash du contenu) -> ré-ingérer = écraser, pas dupliquer."""
+    meta = doc.metadata or {}
+    content_hash = hashlib.sha256((doc.page_content or "").encode("utf-8")).hexdigest()
+    key = "|".join([
+        str(meta.get("source", "")),
+        str(meta.get("page", "")),
+        str(meta.get("type", "text")),
+        content_hash,
+    ])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+def _upsert_chunks(vs: VectorStore, chunks: List[Document], batch_size: int = UPSERT_BATCH_SIZE,
+                   lexical: Optional[BM25Index] = None) -> List[str]:
+    """Upsert par lots; les chunks strictement identiques (même ID) ne sont écrits qu'une fois.
+    `lexical`: index BM25 mis à jour avec les mêmes lots."""
+    unique: Dict[str, Document] = {}
+    for c in chunks:
+        unique.setdefault(_chunk_id(c), c)
+    ids = list(unique)
+    for i in range(0, len(ids), batch_size):
+        batch_ids = ids[i:i + batch_size]
+        vs.add_documents([unique[cid] for cid in batch_ids], ids=batch_ids)  # Chroma: upsert par ID
+        if lexical is not None:
+            lexical.add_documents([unique[cid] for cid in batch_ids], batch_ids)
+    return ids
+
+# --- Manifest (ingestion incrémentale) ---
+
+def _file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _ingestion_config() -> Dict[str, Any]:
+    """Paramètres qui invalident les chunks déjà indexés s'ils changent."""
+    model = OPENAI_EMBEDDING_MODEL if EMBEDDING_BACKEND == "openai" else HF_EMB_MODEL
+    if CHUNKER == "tokens":
+        chunking = {"chunker": "tokens", "chunk_tokens": CHUNK_TOKENS,
+                    "chunk_overlap_tokens": CHUNK_OVERLAP_TOKENS, "tokenizer": OPENAI_MODEL}
+    else:
+        chunking = {"chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP}
+    return {
+        **chunking,
+        "embedding_backend": EMBEDDING_BACKEND,
+        "embedding_model": model,
+        "text_engine": PDF_TEXT_ENGINE,
+        "table_chunk_tokens": TABLE_CHUNK_TOKENS,
+        "table_store": TABLE_STORE,
+        "page_base": 0,  # pages des tableaux Camelot ramenées en 0-based: ré-indexation des anciens index
+        "bm25": HYBRID_SEARCH,
+        "ocr": [OCR_MIN_TEXT_CHARS, OCR_DPI, OCR_LANG] if ENABLE_OCR else False,
+        "near_dup": NEAR_DUP_THRESHOLD if NEAR_DUP_DEDUP else False,
+    }
+
+def _config_hash(cfg: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(cfg, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+def _load_manifest() -> Dict[str, Any]:
+    if MANIFEST_PATH.exists():
+        try:
+            with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data.get("files"), dict):
+                return data
+        except Exception:
+            pass  # manifest illisible -> on repart de zéro
+    return {"version": 1, "files": {}}
+
+def _save_manifest(manifest: Dict[str, Any]) -> None:
+    MANIFEST_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = MANIFEST_PATH.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, MANIFEST_PATH)  # écriture atomique
+
+def _source_chunk_ids(vs: VectorStore, source: str) -> List[str]:
+    return vs.get(where={"source": source}, include=[]).get("ids") or []
+
+def _delete_source_chunks(vs: VectorStore, source: str, keep: Optional[Set[str]] = None,
+                          lexical: Optional[BM25Index] = None) -> int:
+    """Supprime les chunks d'un PDF (metadata 'source'), sauf ceux de `keep`."""
+    keep = keep or set()
+    ids = [i for i in _source_chunk_ids(vs, source) if i not in keep]
+    if ids:
+        vs.delete(ids=ids)
+    if lexical is not None:
+        lexical.delete_source(source, keep)
+    return len(ids)
+
 # --- Ingestion principale ---
 
-def ingest_all_pdfs():
+def ingest_pdfs(force: bool = False, workers: int = INGEST_WORKERS) -> Tuple[VectorStore, Dict[str, Any]]:
+    """Ingestion incrémentale: ne (ré)indexe que les PDF nouveaux ou modifiés.
+
+    Retourne le vector store et un rapport: `files` (par fichier,
+    status: added | updated | unchanged | removed), `pipeline` (stats du flux d'ingestion)
+    et `dedup` (chunks quasi identiques fusionnés, NEAR_DUP_DEDUP).
+    """
     pdfs = _list_pdfs()
     if not pdfs:
         raise FileNotFoundError(f"Aucun PDF trouvé dans {DATA_DIR.resolve()}")
 
-    all_docs: List[Document] = []
+    PERSIST_DIR.mkdir(parents=True, exist_ok=True)
+    vs = get_vectorstore()  # Chroma ou NumpyVectorStore (VECTOR_BACKEND)
+
+    manifest = _load_manifest()
+    files: Dict[str, Any] = manifest["files"]
+    cfg_hash = _config_hash(_ingestion_config())
+    report: List[Dict[str, Any]] = []
+    tables = TableStore(TABLE_STORE_PATH) if TABLE_STORE else None
+    lexical = BM25Index(BM25_PATH) if HYBRID_SEARCH else None  # index BM25 de la recherche hybride
+    entries: Dict[str, Tuple[str, Optional[Dict[str, Any]]]] = {}
+
+    # 1) PDF retirés de DATA_DIR -> purge de leurs chunks
+    current = {str(p) for p in pdfs}
+    for source in sorted(set(files) - current):
+        deleted = _delete_source_chunks(vs, source, lexical=lexical)
+        if lexical is not None:
+            lexical.commit()
+        if tables is not None:
+            tables.delete_source(source)
+            tables.commit()
+        files.pop(source, None)
+        _save_manifest(manifest)
+        report.append({"file": source, "status": "removed", "chunks": 0, "deleted": deleted})
+
+    # 2) PDF nouveaux / modifiés (contenu ou config de chunking)
     for pdf in pdfs:
-        text_docs = _load_text_docs(pdf)
-        table_docs = _load_tables_docs(pdf)  # peut être vide si Camelot indisponible
-        all_docs.extend(text_docs + table_docs)
+        source = str(pdf)
+        sha = _file_sha256(pdf)
+        entry = files.get(source)
+        if not force and entry and entry.get("sha256") == sha and entry.get("config") == cfg_hash:
+            report.append({"file": source, "status": "unchanged", "chunks": entry.get("chunks", 0), "deleted": 0})
+            continue
+        entries[source] = (sha, entry)
 
-    chunks = _split_docs(all_docs)
-    PERSIST_DIR.mkdir(parents=True, exist_ok=True)
+    # 3) flux: parse (process pool) -> split -> file bornée -> embed + upsert par lots.
+    # Le manifest est mis à jour PDF par PDF, une fois tous ses chunks écrits:
+    # après un crash, seuls les PDF non terminés sont repris (upserts idempotents).
+    t0 = time.perf_counter()
+    tasks = [t for source in entries for t in _plan_tasks(Path(source), PAGES_PER_TASK)]
+    stats = {"serial_s": 0.0, "ocr_pages": 0, "ocr_cached": 0, "table_cells": 0}
+    if tables is not None:
+        for source in entries:  # cellules ré-extraites avec les chunks du PDF
+            tables.delete_source(source)
+    batch: List[Document] = []
+    ids_by_file: Dict[str, Set[str]] = {source: set() for source in entries}
+    finished: List[str] = []
+    # quasi-doublons: index MinHash par PDF (portée fichier: supprimer / modifier un PDF
+    # ne touche jamais aux chunks d'un autre). Un doublon n'est ni embeddé ni stocké,
+    # sa position (source, page) est ajoutée au chunk canonique.
+    near_dup: Dict[str, NearDupIndex] = {}
+    touched: Dict[str, Set[int]] = {}
+    dedup = {"chunks": 0, "duplicates": 0, "chars": 0, "saved_chars": 0, "tokens": 0, "saved_tokens": 0}
 
-    emb = get_embedding()
-    vs = Chroma.from_documents(
-        documents=chunks,
-        embedding=emb,
-        collection_name=COLLECTION_NAME,
-        persist_directory=str(PERSIST_DIR),
-    )
+    def _flush() -> None:
+        if batch:
+            _upsert_chunks(vs, batch, lexical=lexical)
+            batch.clear()
+        for source in finished:
+            index = near_dup.pop(source, None)
+            if index is not None and touched.get(source):
+                # ré-upsert des canoniques dont la liste d'occurrences a grandi (même ID,
+                # embedding servi par le cache)
+                _upsert_chunks(vs, [index.docs[i] for i in sorted(touched.pop(source))], lexical=lexical)
+            # purge des chunks obsolètes (y compris doublons d'une collection antérieure au manifest)
+            deleted = _delete_source_chunks(vs, source, keep=ids_by_file[source], lexical=lexical)
+            for store in (tables, lexical):
+                if store is not None:
+                    store.commit()
+            sha, entry = entries[source]
+            files[source] = {"sha256": sha, "config": cfg_hash, "chunks": len(ids_by_file[source])}
+            _save_manifest(manifest)
+            report.append({
+                "file": source,
+                "status": "updated" if entry else "added",
+                "chunks": len(ids_by_file[source]),
+                "deleted": deleted,
+            })
+            ids_by_file[source] = set()  # libère la mémoire
+        finished.clear()
+
+    for source, chunk in _prefetch(
+        _iter_chunks(tasks, workers, stats, {src: sha for src, (sha, _) in entries.items()}),
+        INGEST_QUEUE_SIZE,
+    ):
+        if chunk is _FILE_END:
+            finished.append(source)
+            continue
+        if tables is not None and (chunk.metadata or {}).get("type") in ("table", "table_flat"):
+            # avant la déduplication: un tableau répété est indexé à chacune de ses pages
+            stats["table_cells"] += tables.add_table(
+                source, chunk.metadata.get("page"),
+                chunk.metadata.get("parent_table_id") or _chunk_id(chunk),
+                _csv_rows(chunk.page_content or ""),
+            )
+        if NEAR_DUP_DEDUP:
+            text = chunk.page_content or ""
+            tokens = count_tokens([text], OPENAI_MODEL)[0]
+            dedup["chunks"] += 1
+            dedup["chars"] += len(text)
+            dedup["tokens"] += tokens
+            index = near_dup.setdefault(source, NearDupIndex(NEAR_DUP_THRESHOLD))
+            i, sig = index.find(chunk)
+            if i is not None:
+                if add_occurrence(index.docs[i], chunk):
+                    touched.setdefault(source, set()).add(i)
+                dedup["duplicates"] += 1
+                dedup["saved_chars"] += len(text)
+                dedup["saved_tokens"] += tokens
+                continue
+            index.add(chunk, sig)
+        ids_by_file[source].add(_chunk_id(chunk))
+        batch.append(chunk)
+        if len(batch) >= UPSERT_BATCH_SIZE:
+            _flush()
+    _flush()
+    for store in (tables, lexical):
+        if store is not None:
+            store.commit()
+            store.close()
+    pipeline_stats = {
+        "workers": max(1, min(workers, len(tasks))),
+        "tasks": len(tasks),
+        "parse_s": round(stats["serial_s"], 3),  # temps cumulé des tâches de parsing
+        "wall_s": round(time.perf_counter() - t0, 3),  # parsing + embeddings + upserts
+        "ocr_pages": stats["ocr_pages"],  # pages réellement OCRisées
+        "ocr_cached": stats["ocr_cached"],  # pages servies par le cache OCR
+        "table_cells": stats["table_cells"],  # cellules chiffrées indexées (TABLE_STORE)
+    }
+    return vs, {"files": report, "pipeline": pipeline_stats, "dedup": dedup}
+
+def ingest_all_pdfs(force: bool = False, verbose: bool = True, workers: int = INGEST_WORKERS):
+    vs, report = ingest_pdfs(force=force, workers=workers)
+    if verbose:
+        for r in report["files"]:
+            print(f"- {os.path.basename(r['file'])}: {r['status']} "
+                  f"({r['chunks']} chunks, {r['deleted']} supprimés)")
+        p = report["pipeline"]
+        if p["tasks"]:
+            print(f"Pipeline: {p['tasks']} tâches de parsing ({p['parse_s']}s cumulées, "
+                  f"{p['workers']} workers), {p['wall_s']}s au total")
+            if p["ocr_pages"] or p["ocr_cached"]:
+                print(f"OCR: {p['ocr_pages']} pages OCRisées, {p['ocr_cached']} depuis le cache")
+        d = report["dedup"]
+        if d["duplicates"]:
+            print(f"Quasi-doublons: {d['duplicates']}/{d['chunks']} chunks fusionnés "
+                  f"(-{100 * d['saved_chars'] / max(1, d['chars']):.1f}% de texte stocké, "
+                  f"-{d['saved_tokens']} tokens d'embedding sur {d['tokens']})")
     return vs
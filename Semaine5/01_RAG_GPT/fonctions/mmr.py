@@ -0,0 +1,58 @@
+from __future__ import annotations
+from typing import Callable, List, Sequence, Tuple
+
+import numpy as np
+from langchain.schema import Document
+
+# MMR (Maximal Marginal Relevance) glouton sur un lot de candidats déjà récupérés avec
+# leurs embeddings (une seule requête à la base): à chaque étape on choisit
+#   argmax  lambda * sim(q, c) - (1 - lambda) * max_{s choisi} sim(c, s)
+# La redondance est mise à jour par un seul produit matrice-vecteur (m, d) @ (d,) par
+# étape, sans matrice m x m: O(k * m * d), utilisable avec fetch_k de plusieurs milliers.
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def mmr_select(query: np.ndarray, candidates: np.ndarray, k: int, lambda_mult: float = 0.5) -> List[int]:
+    """`query` (d,) et `candidates` (m, d) normalisés -> indices choisis, dans l'ordre MMR."""
+    return [i for i, _ in mmr_rank(query, candidates, k, lambda_mult)]
+
+def mmr_rank(query: np.ndarray, candidates: np.ndarray, k: int,
+             lambda_mult: float = 0.5) -> List[Tuple[int, float]]:
+    """(indice, score MMR au moment du choix) des k candidats retenus, rang MMR = position."""
+    m = len(candidates)
+    k = min(k, m)
+    if k <= 0:
+        return []
+    candidates = np.asarray(candidates, dtype=np.float32)
+    query = np.asarray(query, dtype=np.float32)
+    gain = lambda_mult * (candidates @ query)
+    redundancy = np.full(m, -np.inf, dtype=np.float32)  # similarité max avec les candidats déjà choisis
+    score = gain.copy()  # 1er choix: le plus pertinent
+    taken = np.zeros(m, dtype=bool)
+    out: List[Tuple[int, float]] = []
+    for step in range(k):
+        i = int(np.argmax(score))
+        out.append((i, float(score[i])))
+        taken[i] = True
+        if step == k - 1:
+            break
+        np.maximum(redundancy, candidates @ candidates[i], out=redundancy)
+        np.subtract(gain, (1.0 - lambda_mult) * redundancy, out=score)
+        score[taken] = -np.inf
+    return out
+
+def mmr_hits(query: np.ndarray, candidates: np.ndarray, relevance: Sequence[float], k: int,
+             lambda_mult: float, doc: Callable[[int], Document]) -> List[Tuple[Document, float]]:
+    """(Document, score de pertinence) dans l'ordre MMR; rang (1..k) dans metadata["mmr_rank"].
+
+    `doc(i)` n'est appelé que pour les k candidats retenus.
+    """
+    out: List[Tuple[Document, float]] = []
+    for rank, (i, _) in enumerate(mmr_rank(query, candidates, k, lambda_mult), start=1):
+        d = doc(i)
+        d.metadata = {**(d.metadata or {}), "mmr_rank": rank}
+        out.append((d, float(relevance[i])))
+    return out
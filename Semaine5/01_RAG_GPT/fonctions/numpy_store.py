@@ -0,0 +1,392 @@
+from __future__ import annotations
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from fonctions.mmr import mmr_hits, normalize as _normalize
+from fonctions.quantization import QUANTIZATIONS, RESCORE_FACTORS, Codes
+from fonctions.utils import match_filter
+
+# Recherche exacte en mémoire (NumPy), alternative à Chroma pour les petits corpus.
+#
+# Sur disque (dossier `path`):
+#   vectors-<g>.bin  matrice (n, dim) float32|float16, embeddings L2-normalisés, mappée en mémoire
+#   docs-<g>.jsonl   journal: {"row", "id", "text", "metadata"} (ajout) | {"delete": id}
+#   meta.json        {"dim", "dtype", "generation"}
+#   codes-<g>.<q>    codes int8 | binary | matryoshka (quantization != "none"), gardés en RAM
+# Avec quantification, la recherche parcourt les codes puis re-score exactement les
+# k * rescore_factor meilleurs candidats sur la matrice float (seules ces lignes sont lues).
+# Un upsert ajoute une ligne et rend l'ancienne morte; le journal est compacté (génération
+# g+1, bascule atomique via meta.json) quand les lignes mortes dépassent les vivantes.
+
+_BLOCK_ROWS = 65536  # lecture / réécriture de la matrice par blocs
+_SCORE_ROWS = 1024   # produit matrice-vecteur par petits blocs: conversion float16 -> float32 en cache CPU
+
+class NumpyVectorStore(VectorStore):
+    """Base vectorielle exacte: embeddings normalisés dans une matrice mappée, recherche NumPy.
+
+    Même surface que Chroma pour le pipeline (`similarity_search_with_relevance_scores`,
+    `max_marginal_relevance_search_with_score`, filtres `filter=`) et pour l'ingestion
+    (`add_documents(ids=...)` = upsert, `get(where=...)`, `delete(ids=...)`).
+    Distances = L2 au carré comme Chroma, donc mêmes scores de pertinence.
+    """
+
+    def __init__(self, embedding_function: Embeddings, path: Path, dtype: str = "float32",
+                 quantization: str = "none", rescore_factor: int = 0, truncate_dims: int = 256):
+        self._embedding = embedding_function
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        meta = self._read_meta()
+        self.dim: Optional[int] = meta.get("dim")
+        self.dtype = np.dtype(meta.get("dtype", dtype))
+        self.generation = int(meta.get("generation", 0))
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Quantification inconnue: {quantization}. Utilisez {', '.join(QUANTIZATIONS)}.")
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor or RESCORE_FACTORS.get(quantization, 1)  # 0 = défaut du codage
+        self.truncate_dims = truncate_dims  # quantization="matryoshka": dimensions du 1er étage
+        self._codes: Optional[Codes] = None
+        self._ids: List[Optional[str]] = []          # id par ligne (None = ligne morte)
+        self._texts: List[str] = []
+        self._metas: List[Dict[str, Any]] = []
+        self._rows: Dict[str, int] = {}              # id -> ligne vivante
+        self._matrix: Optional[np.ndarray] = None
+        self._alive = np.zeros(0, dtype=bool)
+        self._masks: Dict[str, np.ndarray] = {}      # cache des filtres (invalidé à chaque écriture)
+        self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    # --- persistance ---
+
+    def _vectors_file(self, generation: int) -> Path:
+        return self.path / f"vectors-{generation}.bin"
+
+    def _docs_file(self, generation: int) -> Path:
+        return self.path / f"docs-{generation}.jsonl"
+
+    def _codes_file(self, generation: int) -> Path:
+        suffix = f"matryoshka{self.truncate_dims}" if self.quantization == "matryoshka" else self.quantization
+        return self.path / f"codes-{generation}.{suffix}"
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self._vectors_file(self.generation)
+
+    @property
+    def _docs_path(self) -> Path:
+        return self._docs_file(self.generation)
+
+    def _read_meta(self) -> Dict[str, Any]:
+        try:
+            with open(self.path / "meta.json", "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_meta(self) -> None:
+        tmp = self.path / "meta.json.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "dtype": self.dtype.name, "generation": self.generation}, f)
+        os.replace(tmp, self.path / "meta.json")
+
+    def _load(self) -> None:
+        if self._docs_path.exists():
+            with open(self._docs_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        break  # dernière ligne tronquée (crash pendant l'écriture)
+                    if "delete" in rec:
+                        row = self._rows.pop(rec["delete"], None)
+                        if row is not None:
+                            self._ids[row] = None
+                        continue
+                    if rec["row"] != len(self._ids):
+                        break
+                    old = self._rows.get(rec["id"])
+                    if old is not None:
+                        self._ids[old] = None
+                    self._ids.append(rec["id"])
+                    self._texts.append(rec["text"])
+                    self._metas.append(rec["metadata"])
+                    self._rows[rec["id"]] = rec["row"]
+        self._remap()
+
+    def _remap(self) -> None:
+        """(Re)mappe vectors.bin; les lignes sans entrée dans le journal sont ignorées."""
+        n = len(self._ids)
+        self._alive = np.array([i is not None for i in self._ids], dtype=bool)
+        self._masks.clear()
+        if n == 0 or self.dim is None:
+            self._matrix = None
+            return
+        self._matrix = np.memmap(self._vectors_path, dtype=self.dtype, mode="r", shape=(n, self.dim))
+        if self.quantization != "none":
+            if self._codes is None:
+                self._codes = Codes(self.quantization, self.dim, self._codes_file(self.generation),
+                                    dims=self.truncate_dims)
+                self._codes.load(n)
+            self._codes.extend(self._matrix)  # seules les lignes ajoutées sont encodées
+
+    def _compact(self) -> None:
+        """Réécrit les fichiers sans les lignes mortes."""
+        live = np.flatnonzero(self._alive)
+        old = self.generation
+        with open(self._vectors_file(old + 1), "wb") as fv, open(self._docs_file(old + 1), "w", encoding="utf-8") as fd:
+            for start in range(0, len(live), _BLOCK_ROWS):
+                fv.write(np.ascontiguousarray(self._matrix[live[start:start + _BLOCK_ROWS]]).tobytes())
+            for new_row, row in enumerate(live):
+                fd.write(json.dumps({"row": new_row, "id": self._ids[row], "text": self._texts[row],
+                                     "metadata": self._metas[row]}, ensure_ascii=False) + "\n")
+        self._matrix = None  # libère le mapping avant suppression
+        self.generation = old + 1
+        self._write_meta()  # bascule atomique vers la nouvelle génération
+        for path in (self._vectors_file(old), self._docs_file(old), self._codes_file(old)):
+            path.unlink(missing_ok=True)
+        if self._codes is not None:
+            self._codes.reset()
+            self._codes = None  # ré-encodés depuis la nouvelle matrice
+        self._ids = [self._ids[r] for r in live]
+        self._texts = [self._texts[r] for r in live]
+        self._metas = [self._metas[r] for r in live]
+        self._rows = {cid: i for i, cid in enumerate(self._ids)}
+        self._remap()
+
+    # --- écriture ---
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        *,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        if ids is None:
+            import uuid
+            ids = [uuid.uuid4().hex for _ in texts]
+        vectors = _normalize(self._embedding.embed_documents(texts))
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                self._write_meta()
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Dimension d'embedding {vectors.shape[1]} != {self.dim} de la base")
+            start = len(self._ids)
+            size = start * self.dim * self.dtype.itemsize
+            if self._vectors_path.exists() and self._vectors_path.stat().st_size > size:
+                os.truncate(self._vectors_path, size)  # vecteurs orphelins d'un ajout interrompu
+            if self._codes is not None and self._codes.path.exists():
+                os.truncate(self._codes.path, start * self._codes.record.itemsize)
+            with open(self._vectors_path, "ab") as f:  # vecteurs d'abord: le journal fait foi
+                f.write(vectors.astype(self.dtype).tobytes())
+            with open(self._docs_path, "a", encoding="utf-8") as f:
+                for i, (cid, text, meta) in enumerate(zip(ids, texts, metadatas)):
+                    f.write(json.dumps({"row": start + i, "id": cid, "text": text, "metadata": meta or {}},
+                                       ensure_ascii=False) + "\n")
+            for i, (cid, text, meta) in enumerate(zip(ids, texts, metadatas)):
+                old = self._rows.get(cid)
+                if old is not None:
+                    self._ids[old] = None  # upsert: l'ancienne version devient morte
+                self._ids.append(cid)
+                self._texts.append(text)
+                self._metas.append(meta or {})
+                self._rows[cid] = start + i
+            self._remap()
+            if len(self._ids) - len(self._rows) > max(1024, len(self._rows)):
+                self._compact()
+        return list(ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+        with self._lock:
+            gone = [cid for cid in ids if cid in self._rows]
+            if gone:
+                with open(self._docs_path, "a", encoding="utf-8") as f:
+                    for cid in gone:
+                        f.write(json.dumps({"delete": cid}) + "\n")
+                for cid in gone:
+                    self._ids[self._rows.pop(cid)] = None
+                self._remap()
+                if len(self._ids) - len(self._rows) > max(1024, len(self._rows)):
+                    self._compact()
+        return True
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+            include: Optional[List[str]] = None, **kwargs: Any) -> Dict[str, Any]:
+        """Comme `Chroma.get`: {"ids", "documents", "metadatas"} des lignes vivantes."""
+        with self._lock:
+            rows = [self._rows[i] for i in ids if i in self._rows] if ids is not None else sorted(self._rows.values())
+            if where:
+                rows = [r for r in rows if match_filter(self._metas[r], where)]
+            return {
+                "ids": [self._ids[r] for r in rows],
+                "documents": [self._texts[r] for r in rows],
+                "metadatas": [self._metas[r] for r in rows],
+            }
+
+    def get_by_ids(self, ids, /) -> List[Document]:
+        got = self.get(ids=list(ids))
+        return [Document(page_content=t, metadata=m, id=i)
+                for i, t, m in zip(got["ids"], got["documents"], got["metadatas"])]
+
+    def count(self) -> int:
+        return len(self._rows)
+
+    def memory_bytes(self) -> Dict[str, int]:
+        """Octets de l'index en RAM (`codes`) et de la matrice float mappée (`vectors`)."""
+        vectors = 0 if self._matrix is None else int(self._matrix.size * self._matrix.itemsize)
+        return {"vectors": vectors, "codes": self._codes.nbytes if self._codes is not None else 0}
+
+    # --- recherche ---
+
+    def _mask(self, flt: Optional[Dict[str, Any]]) -> np.ndarray:
+        if not flt:
+            return self._alive
+        key = json.dumps(flt, sort_keys=True, default=str)
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = self._alive & np.fromiter((match_filter(m, flt) for m in self._metas), dtype=bool, count=len(self._metas))
+            self._masks[key] = mask
+        return mask
+
+    def _scores(self, query: np.ndarray) -> np.ndarray:
+        out = np.empty(len(self._ids), dtype=np.float32)
+        rows = _BLOCK_ROWS if self.dtype == np.float32 else _SCORE_ROWS
+        for start in range(0, len(out), rows):
+            block = self._matrix[start:start + rows]
+            out[start:start + len(block)] = block.astype(np.float32, copy=False) @ query
+        return out
+
+    def _top(self, query: np.ndarray, k: int, flt: Optional[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+        """(lignes, similarités cosinus) des k meilleurs résultats, triés."""
+        with self._lock:
+            if self._matrix is None:
+                return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+            mask = self._mask(flt)
+            k = min(k, int(mask.sum()))
+            if k <= 0:
+                return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+            if self._codes is None:
+                sims = self._scores(query)
+            else:
+                # 1er étage sur les codes, puis re-scoring exact des meilleurs candidats
+                approx = self._codes.scores(query)
+                approx[~mask] = -np.inf
+                n_cand = min(int(mask.sum()), max(k * self.rescore_factor, 64))
+                cand = np.sort(np.argpartition(-approx, n_cand - 1)[:n_cand])
+                exact = self._matrix[cand].astype(np.float32) @ query
+                sims = np.full(len(self._ids), -np.inf, dtype=np.float32)
+                sims[cand] = exact
+        sims[~mask] = -np.inf
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top], kind="stable")]
+        return top, sims[top]
+
+    def _doc(self, row: int) -> Document:
+        return Document(page_content=self._texts[row], metadata=dict(self._metas[row]), id=self._ids[row])
+
+    def _query_vector(self, query: str) -> np.ndarray:
+        return _normalize(self._embedding.embed_query(query))
+
+    def similarity_search_with_score_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        rows, sims = self._top(_normalize(embedding), k, filter)
+        return [(self._doc(r), float(max(0.0, 2.0 - 2.0 * s))) for r, s in zip(rows, sims)]  # L2² entre vecteurs unitaires
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self._query_vector(query), k, filter)
+
+    def similarity_search(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [d for d, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [d for d, _ in self.similarity_search_with_score_by_vector(embedding, k, filter)]
+
+    def similarity_search_with_relevance_scores_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        """Top-k avec score de pertinence [0, 1] (même échelle que `similarity_search_with_relevance_scores`)."""
+        return [
+            (doc, self._euclidean_relevance_score_fn(dist))
+            for doc, dist in self.similarity_search_with_score_by_vector(embedding, k, filter)
+        ]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        return self._euclidean_relevance_score_fn
+
+    def _mmr(self, query: np.ndarray, k: int, fetch_k: int, lambda_mult: float,
+             filter: Optional[Dict[str, Any]]) -> List[Tuple[Document, float]]:
+        rows, sims = self._top(query, fetch_k, filter)
+        if not len(rows):
+            return []
+        with self._lock:
+            cands = _normalize(self._matrix[rows])  # fetch_k lignes seulement
+            relevance = [self._euclidean_relevance_score_fn(float(max(0.0, 2.0 - 2.0 * s))) for s in sims]
+            return mmr_hits(query, cands, relevance, k, lambda_mult, lambda i: self._doc(int(rows[i])))
+
+    def max_marginal_relevance_search_with_score(
+        self, query: str, k: int = 4, fetch_k: int = 20, lambda_mult: float = 0.5,
+        filter: Optional[Dict[str, Any]] = None, **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        """MMR avec score de pertinence (même échelle que `similarity_search_with_relevance_scores`)."""
+        return self._mmr(self._query_vector(query), k, fetch_k, lambda_mult, filter)
+
+    def max_marginal_relevance_search_with_score_by_vector(
+        self, embedding: List[float], k: int = 4, fetch_k: int = 20, lambda_mult: float = 0.5,
+        filter: Optional[Dict[str, Any]] = None, **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        return self._mmr(_normalize(embedding), k, fetch_k, lambda_mult, filter)
+
+    def max_marginal_relevance_search_by_vector(
+        self, embedding: List[float], k: int = 4, fetch_k: int = 20, lambda_mult: float = 0.5,
+        filter: Optional[Dict[str, Any]] = None, **kwargs: Any,
+    ) -> List[Document]:
+        return [d for d, _ in self._mmr(_normalize(embedding), k, fetch_k, lambda_mult, filter)]
+
+    def max_marginal_relevance_search(
+        self, query: str, k: int = 4, fetch_k: int = 20, lambda_mult: float = 0.5,
+        filter: Optional[Dict[str, Any]] = None, **kwargs: Any,
+    ) -> List[Document]:
+        return [d for d, _ in self.max_marginal_relevance_search_with_score(query, k, fetch_k, lambda_mult, filter)]
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        *,
+        ids: Optional[List[str]] = None,
+        path: Optional[Path] = None,
+        **kwargs: Any,
+    ) -> "NumpyVectorStore":
+        if path is None:
+            raise ValueError("NumpyVectorStore.from_texts: `path` requis")
+        store = cls(embedding, path, **kwargs)
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
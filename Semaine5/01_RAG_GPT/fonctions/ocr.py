@@ -0,0 +1,104 @@
+from __future__ import annotations
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from fonctions.config import OCR_DPI, OCR_LANG, OCR_WORKERS, OCR_CACHE_PATH, POPPLER_PATH, TESSERACT_CMD
+
+
+def ocr_available() -> bool:
+    try:
+        import pdf2image  # noqa: F401  (nécessite Poppler)
+        import pytesseract  # noqa: F401  (nécessite Tesseract)
+    except Exception:
+        return False
+    return True
+
+
+def _ocr_page(task: Tuple[str, int, int, str]) -> Optional[str]:
+    """Worker (process pool): rasterise une page (0-based) et renvoie le texte OCR."""
+    pdf, page, dpi, lang = task
+    from pdf2image import convert_from_path
+    import pytesseract
+    if TESSERACT_CMD:
+        pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+    try:
+        images = convert_from_path(pdf, dpi=dpi, first_page=page + 1, last_page=page + 1,
+                                   poppler_path=POPPLER_PATH)
+        return "\n".join(pytesseract.image_to_string(img, lang=lang) for img in images).strip()
+    except Exception:
+        return None  # échec (binaire absent, page illisible): pas mis en cache
+
+
+class OcrStage:
+    """OCR sélectif: uniquement les pages demandées, en process pool, avec cache disque.
+
+    Le cache est indexé par (hash du fichier, page, DPI, langue): une page déjà reconnue
+    n'est jamais ré-OCRisée, même si le PDF est renommé ou ré-ingéré.
+    À utiliser comme context manager (le pool vit le temps de l'ingestion).
+    """
+
+    def __init__(self, workers: int = OCR_WORKERS, dpi: int = OCR_DPI, lang: str = OCR_LANG,
+                 cache_path: Path = OCR_CACHE_PATH):
+        self.workers = max(1, workers)
+        self.dpi = dpi
+        self.lang = lang
+        self.stats = {"pages": 0, "cached": 0, "ocr": 0}
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(cache_path), check_same_thread=False, timeout=30)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS ocr_pages ("
+            " file_hash TEXT, page INTEGER, dpi INTEGER, lang TEXT, text TEXT,"
+            " PRIMARY KEY (file_hash, page, dpi, lang))"
+        )
+        self._db.commit()
+
+    def __enter__(self) -> "OcrStage":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        self._db.close()
+
+    def ocr_pages(self, pdf: str, file_hash: str, pages: List[int]) -> Dict[int, str]:
+        if not pages:
+            return {}
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT page, text FROM ocr_pages WHERE file_hash=? AND dpi=? AND lang=?"
+                f" AND page IN ({','.join('?' * len(pages))})",
+                [file_hash, self.dpi, self.lang, *pages],
+            ).fetchall()
+        out = {p: t for p, t in rows}
+        todo = [p for p in pages if p not in out]
+        self.stats["pages"] += len(pages)
+        self.stats["cached"] += len(pages) - len(todo)
+        if not todo:
+            return out
+
+        tasks = [(pdf, p, self.dpi, self.lang) for p in todo]
+        if self.workers <= 1 or len(tasks) == 1:
+            texts = [_ocr_page(t) for t in tasks]
+        else:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            texts = list(self._pool.map(_ocr_page, tasks))
+        self.stats["ocr"] += len(todo)
+
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO ocr_pages(file_hash, page, dpi, lang, text) VALUES (?, ?, ?, ?, ?)",
+                [(file_hash, p, self.dpi, self.lang, t) for p, t in zip(todo, texts) if t is not None],
+            )
+            self._db.commit()
+        out.update((p, t or "") for p, t in zip(todo, texts))
+        return out
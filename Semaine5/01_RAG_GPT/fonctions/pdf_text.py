@@ -0,0 +1,72 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from langchain.schema import Document
+
+from fonctions.config import PDF_TEXT_ENGINE
+
+# Chaque moteur: (chemin, [début, fin) 0-based ou None) -> [(page, texte)]
+PageRange = Optional[Tuple[int, int]]
+
+
+def _bounds(pages: PageRange, n: int) -> range:
+    start, end = pages if pages is not None else (0, n)
+    return range(start, min(end, n))
+
+
+def _pypdf(path: str, pages: PageRange) -> List[Tuple[int, str]]:
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    return [(i, reader.pages[i].extract_text() or "") for i in _bounds(pages, len(reader.pages))]
+
+
+def _pypdfium2(path: str, pages: PageRange) -> List[Tuple[int, str]]:
+    import pypdfium2 as pdfium
+    pdf = pdfium.PdfDocument(path)
+    try:
+        out = []
+        for i in _bounds(pages, len(pdf)):
+            page = pdf[i]
+            textpage = page.get_textpage()
+            out.append((i, (textpage.get_text_range() or "").replace("\r\n", "\n")))
+            textpage.close()
+            page.close()
+        return out
+    finally:
+        pdf.close()
+
+
+def _pymupdf(path: str, pages: PageRange) -> List[Tuple[int, str]]:
+    try:
+        import pymupdf
+    except ImportError:
+        import fitz as pymupdf  # anciennes versions de PyMuPDF
+    with pymupdf.open(path) as doc:
+        return [(i, doc[i].get_text("text") or "") for i in _bounds(pages, doc.page_count)]
+
+
+def _pdfplumber(path: str, pages: PageRange) -> List[Tuple[int, str]]:
+    import pdfplumber
+    with pdfplumber.open(path) as pdf:
+        return [(i, pdf.pages[i].extract_text() or "") for i in _bounds(pages, len(pdf.pages))]
+
+
+ENGINES: Dict[str, Callable[[str, PageRange], List[Tuple[int, str]]]] = {
+    "pypdf": _pypdf,
+    "pypdfium2": _pypdfium2,
+    "pymupdf": _pymupdf,
+    "pdfplumber": _pdfplumber,
+}
+
+
+def extract_text_docs(pdf_path: Path, pages: PageRange = None, engine: str = PDF_TEXT_ENGINE) -> List[Document]:
+    """Une page = un Document, mêmes métadonnées quel que soit le moteur: source, page (0-based), type."""
+    try:
+        extract = ENGINES[engine]
+    except KeyError:
+        raise ValueError(f"Moteur d'extraction PDF non supporté: {engine}. Choix: {', '.join(ENGINES)}.")
+    return [
+        Document(page_content=text, metadata={"source": str(pdf_path), "page": i, "type": "text"})
+        for i, text in extract(str(pdf_path), pages)
+    ]
@@ -0,0 +1,112 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+# Codes compacts pour le premier étage de recherche de NumpyVectorStore:
+#   int8    1 octet / dimension + échelle float32 par vecteur (x4 plus petit que float32)
+#   binary  1 bit / dimension (signe), distance de Hamming (x32 plus petit)
+#   matryoshka  les `dims` premières dimensions renormalisées, en float32 (x3072/256 = x12):
+#           équivalent au paramètre `dimensions` des embeddings OpenAI v3, sans nouvel appel API
+# Les meilleurs candidats sont ensuite re-scorés exactement sur les vecteurs float.
+
+QUANTIZATIONS = ("none", "int8", "binary", "matryoshka")
+RESCORE_FACTORS = {"int8": 4, "binary": 32, "matryoshka": 8}  # candidats re-scorés = k * facteur
+
+_M1 = np.uint64(0x5555555555555555)
+_M2 = np.uint64(0x3333333333333333)
+_M4 = np.uint64(0x0F0F0F0F0F0F0F0F)
+_H01 = np.uint64(0x0101010101010101)
+
+def _popcount(x: np.ndarray) -> np.ndarray:
+    """Bits à 1 par mot uint64 (np.bitwise_count si NumPy >= 2, sinon SWAR)."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(x)
+    x = x - ((x >> np.uint64(1)) & _M1)
+    x = (x & _M2) + ((x >> np.uint64(2)) & _M2)
+    x = (x + (x >> np.uint64(4))) & _M4
+    return (x * _H01) >> np.uint64(56)
+
+class Codes:
+    """Codes en RAM des lignes d'une matrice de vecteurs normalisés, persistés dans `path`."""
+
+    def __init__(self, kind: str, dim: int, path: Path, dims: int = 256):
+        if kind not in QUANTIZATIONS[1:]:
+            raise ValueError(f"Quantification inconnue: {kind}. Utilisez {', '.join(QUANTIZATIONS)}.")
+        self.kind = kind
+        self.dim = dim
+        self.path = path
+        if kind == "int8":
+            self.record = np.dtype([("scale", "<f4"), ("code", "i1", (dim,))])
+        elif kind == "matryoshka":
+            self.dims = min(dims, dim)
+            self.record = np.dtype([("code", "<f4", (self.dims,))])
+        else:
+            self.words = -(-dim // 64)  # bits complétés à un multiple de 64 (mots uint64)
+            self.record = np.dtype([("code", "<u8", (self.words,))])
+        self.data = np.zeros(0, dtype=self.record)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.data.nbytes)
+
+    def load(self, n_rows: int) -> None:
+        """Codes déjà calculés (au plus n_rows: l'excédent vient d'un ajout interrompu)."""
+        data: Optional[np.ndarray] = None
+        if self.path.exists():
+            data = np.fromfile(self.path, dtype=self.record, count=n_rows)
+            if self.path.stat().st_size > n_rows * self.record.itemsize:
+                with open(self.path, "r+b") as f:
+                    f.truncate(n_rows * self.record.itemsize)
+        self.data = data if data is not None else np.zeros(0, dtype=self.record)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        out = np.zeros(len(vectors), dtype=self.record)
+        if self.kind == "int8":
+            scale = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127.0
+            out["scale"] = scale
+            out["code"] = np.clip(np.rint(vectors / scale[:, None]), -127, 127).astype(np.int8)
+        elif self.kind == "matryoshka":
+            head = vectors[:, :self.dims]
+            out["code"] = head / np.maximum(np.linalg.norm(head, axis=1, keepdims=True), 1e-12)
+        else:
+            bits = np.packbits(vectors > 0, axis=1)
+            padded = np.zeros((len(vectors), self.words * 8), dtype=np.uint8)
+            padded[:, :bits.shape[1]] = bits
+            out["code"] = padded.view("<u8")
+        return out
+
+    def extend(self, matrix: np.ndarray, block_rows: int = 65536) -> None:
+        """Encode les lignes de `matrix` qui n'ont pas encore de code (ajout seul)."""
+        start = len(self.data)
+        if start >= len(matrix):
+            return
+        parts = [self.encode(matrix[i:i + block_rows]) for i in range(start, len(matrix), block_rows)]
+        new = np.concatenate(parts)
+        with open(self.path, "ab") as f:
+            f.write(new.tobytes())
+        self.data = np.concatenate([self.data, new])
+
+    def reset(self) -> None:
+        self.path.unlink(missing_ok=True)
+        self.data = np.zeros(0, dtype=self.record)
+
+    def scores(self, query: np.ndarray, block_rows: int = 1024) -> np.ndarray:
+        """Similarité approchée (plus grand = plus proche) de chaque ligne avec `query`."""
+        out = np.empty(len(self.data), dtype=np.float32)
+        if self.kind == "int8":
+            # conversion int8 -> float32 par petits blocs (restent en cache CPU), puis BLAS
+            for i in range(0, len(out), block_rows):
+                block = self.data[i:i + block_rows]
+                out[i:i + len(block)] = (block["code"].astype(np.float32) @ query) * block["scale"]
+        elif self.kind == "matryoshka":
+            out[:] = self.data["code"] @ self.encode(query[None, :])["code"][0]
+        else:
+            q = self.encode(query[None, :])["code"][0]
+            for i in range(0, len(out), block_rows):
+                block = self.data["code"][i:i + block_rows]
+                hamming = _popcount(block ^ q).sum(axis=1)
+                out[i:i + len(block)] = self.dim - 2.0 * hamming  # bits d'accord - bits en désaccord
+        return out
@@ -1,9 +1,25 @@
-from typing import List, Tuple, Dict, Any
+import asyncio
+import math
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
 import os
+import time
 
-from fonctions.config import TOP_K, LLM_BACKEND, OPENAI_MODEL
-from fonctions.retrieval import get_vectorstore
+from fonctions.answer_cache import SemanticAnswerCache, corpus_version, text_hash
+from fonctions.bm25 import BM25Index, rrf_fuse
+from fonctions.compression import compress_hits
+from fonctions.context import pack_context
+from fonctions.config import (
+    TOP_K, LLM_BACKEND, OPENAI_MODEL, TABLE_STORE, TABLE_STORE_PATH, HYBRID_SEARCH, BM25_PATH, RRF_K, HYBRID_TABLE_SHARE,
+    CONTEXT_TOKEN_BUDGET, CONTEXT_COMPRESSION, COMPRESSION_SENTENCES, MANIFEST_PATH, SEMANTIC_CACHE, SEMANTIC_CACHE_PATH, SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_TTL_S, SEMANTIC_CACHE_MAX_ENTRIES, RETRIEVAL_TIMEOUT_S, ANSWER_TIMEOUT_S, LLM_TIMEOUT_S,
+)
+from fonctions.dedup import content_hash, merge_hits, occurrence_pages
+from fonctions.retrieval import aembed_query, embed_query, get_vectorstore, mmr_search_by_vector, search_by_vector
+from fonctions.table_store import TableStore
+from fonctions.tokens import count_tokens
 from langchain.schema import Document
+from langchain_core.vectorstores import VectorStore
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_openai import ChatOpenAI
@@ -31,13 +47,19 @@ Consignes:
 - Si l'information n'est pas disponible dans le contexte, dis-le clairement.
 """
 
+# une modification des prompts, du modèle ou de l'assemblage du contexte invalide le cache des réponses
+PROMPT_VERSION = text_hash(
+    f"{SYSTEM_PROMPT}|{USER_PROMPT_QA}|{LLM_BACKEND}|{OPENAI_MODEL}|{CONTEXT_TOKEN_BUDGET}"
+    f"|{COMPRESSION_SENTENCES if CONTEXT_COMPRESSION else 0}"
+)
+
 def _load_llm() -> ChatOpenAI:
     if LLM_BACKEND != "openai":
         raise ValueError(f"Backend LLM non supporté: {LLM_BACKEND}. Utilisez 'openai'.")
     key = os.getenv("OPENAI_API_KEY")
     if not key:
         raise RuntimeError("OPENAI_API_KEY manquante pour le backend OpenAI.")
-    return ChatOpenAI(model=OPENAI_MODEL, temperature=0.1)
+    return ChatOpenAI(model=OPENAI_MODEL, temperature=0.1, timeout=LLM_TIMEOUT_S)
 
 def _normalize_score(s: float) -> float:
     if s < 0:
@@ -46,57 +68,155 @@ def _normalize_score(s: float) -> float:
         s = 1.0 / (1.0 + s)
     return max(0.0, min(1.0, s))
 
+def _ms(t0: float) -> float:
+    return round((time.perf_counter() - t0) * 1000, 1)
+
 class RAGPipeline:
-    def __init__(self, top_k: int = TOP_K):
-        self.vs = get_vectorstore()
+    def __init__(self, top_k: int = TOP_K, vs: Optional[VectorStore] = None, llm: Optional[ChatOpenAI] = None,
+                 tables: Optional[TableStore] = None, bm25: Optional[BM25Index] = None,
+                 cache: Optional[SemanticAnswerCache] = None, defaults: bool = True):
+        """Composants non fournis construits d'après la config (`defaults=False`: laissés absents)."""
+        self.vs = vs if vs is not None else get_vectorstore()
         self.top_k = top_k
-        self.llm = _load_llm()
+        self.llm = llm if llm is not None or not defaults else _load_llm()
+        # raccourci KPI: cellules des tableaux indexées à l'ingestion (TABLE_STORE)
+        if tables is None and defaults and TABLE_STORE and TABLE_STORE_PATH.exists():
+            tables = TableStore(TABLE_STORE_PATH)
+        self.tables = tables
+        # recherche hybride: index BM25 construit à l'ingestion, interrogé en parallèle des vecteurs
+        if bm25 is None and defaults and HYBRID_SEARCH and BM25_PATH.exists():
+            bm25 = BM25Index(BM25_PATH)
+        self.bm25 = bm25
+        self._pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix="retrieve")
+        if cache is None and defaults and SEMANTIC_CACHE:
+            cache = SemanticAnswerCache(
+                SEMANTIC_CACHE_PATH, threshold=SEMANTIC_CACHE_THRESHOLD,
+                ttl_s=SEMANTIC_CACHE_TTL_S, max_entries=SEMANTIC_CACHE_MAX_ENTRIES,
+            )
+        self.cache = cache
         self._qa_prompt = ChatPromptTemplate.from_messages([
             ("system", SYSTEM_PROMPT),
             ("user", USER_PROMPT_QA),
         ])
         self._parser = StrOutputParser()
 
+    @classmethod
+    def for_retrieval(cls, vs: VectorStore, top_k: int = TOP_K, bm25: Optional[BM25Index] = None) -> "RAGPipeline":
+        """retrieve et prompt seuls (benchmarks): ni LLM, ni index de tableaux, ni cache."""
+        return cls(top_k, vs=vs, bm25=bm25, defaults=False)
+
+    def _start(self, jobs: Dict[str, Callable[[], Any]], timings: Dict[str, float]) -> Dict[str, Any]:
+        """Lance les recherches sur le pool du pipeline; chacune est chronométrée, une recherche en échec -> []."""
+        def _timed(name: str, fn: Callable[[], Any]) -> Any:
+            t0 = time.perf_counter()
+            try:
+                return fn()
+            except Exception:
+                return []
+            finally:
+                timings[f"{name}_ms"] = _ms(t0)
+        return {name: self._pool.submit(_timed, name, fn) for name, fn in jobs.items()}
+
+    @staticmethod
+    def _wait(started: Dict[str, Future]) -> Dict[str, Any]:
+        return {name: f.result() for name, f in started.items()}
+
+    def _general_search(self, qvec: List[float]) -> List[Tuple[Document, float]]:
+        return mmr_search_by_vector(self.vs, qvec, k=self.top_k, fetch_k=max(40, self.top_k * 8), lambda_mult=0.1)
+
+    def _lexical_jobs(self, query: str) -> Dict[str, Callable[[], Any]]:
+        if self.bm25 is None:
+            return {}
+        return {"bm25": lambda: self.bm25.search(query, k=self.top_k * 2)}
+
+    def _vector_jobs(self, qvec: List[float]) -> Dict[str, Callable[[], Any]]:
+        return {
+            "tables": lambda: search_by_vector(
+                self.vs, qvec, k=self.top_k, filter={"type": {"$in": ["table", "table_flat"]}},
+            ),
+            "general": lambda: self._general_search(qvec),
+        }
+
     # --- Retriever "table-first" ---
-    def retrieve(self, query: str) -> List[Tuple[Document, float]]:
-        hits: List[Tuple[Document, float]] = []
+    def retrieve(self, query: str, timings: Optional[Dict[str, float]] = None,
+                 qvec: Optional[List[float]] = None) -> List[Tuple[Document, float]]:
+        """Passages pour `query` (`qvec`: embedding déjà calculé); `timings` reçoit la latence de chaque étape en ms."""
+        timings = {} if timings is None else timings
+        t_start = time.perf_counter()
+        # BM25 n'a pas besoin de l'embedding: lancé pendant l'appel API
+        lexical = self._start(self._lexical_jobs(query), timings)
 
-        # 1) d'abord les tableaux (si filtre supporté)
-        try:
-            tab_raw = self.vs.similarity_search_with_relevance_scores(
-                query,
-                k=self.top_k,
-                filter={"type": {"$in": ["table", "table_flat"]}},
-            )
-            hits.extend(tab_raw)
-        except Exception:
-            pass
+        # la question est vectorisée une seule fois; tableaux et recherche générale (MMR)
+        # partent en même temps sur ce vecteur: la latence est celle de la plus lente, pas la somme
+        if qvec is None:
+            t0 = time.perf_counter()
+            qvec = embed_query(self.vs, query)
+            timings["embed_ms"] = _ms(t0)
+        res = self._wait({**self._start(self._vector_jobs(qvec), timings), **lexical})
+        return self._fuse(res, timings, t_start)
+
+    async def aretrieve(self, query: str, timings: Optional[Dict[str, float]] = None,
+                        qvec: Optional[List[float]] = None,
+                        timeout: Optional[float] = RETRIEVAL_TIMEOUT_S) -> List[Tuple[Document, float]]:
+        """Version asynchrone de `retrieve`: embedding natif async, recherches dans des threads.
 
-        # 2) compléter avec recherche générale
-        if len(hits) < self.top_k:
+        Une recherche qui dépasse `timeout` secondes (à partir de l'embedding) est abandonnée -> [].
+        """
+        timings = {} if timings is None else timings
+        t_start = time.perf_counter()
+
+        async def _timed(name: str, fn: Callable[[], Any]) -> Any:
+            t0 = time.perf_counter()
             try:
-                mmr_raw = self.vs.max_marginal_relevance_search_with_score(
-                    query, k=self.top_k, fetch_k=max(40, self.top_k * 8), lambda_mult=0.1
-                )
-                hits.extend(mmr_raw)
+                return await asyncio.to_thread(fn)
             except Exception:
-                sim_raw = self.vs.similarity_search_with_relevance_scores(query, k=self.top_k)
-                hits.extend(sim_raw)
+                return []
+            finally:
+                timings[f"{name}_ms"] = _ms(t0)
+
+        tasks = {name: asyncio.create_task(_timed(name, fn)) for name, fn in self._lexical_jobs(query).items()}
+        try:
+            if qvec is None:
+                t0 = time.perf_counter()
+                qvec = await aembed_query(self.vs, query)
+                timings["embed_ms"] = _ms(t0)
+            tasks.update({name: asyncio.create_task(_timed(name, fn)) for name, fn in self._vector_jobs(qvec).items()})
+            await asyncio.wait(tasks.values(), timeout=timeout)
+        finally:
+            for task in tasks.values():
+                task.cancel()  # annulation ou délai dépassé: les recherches en cours sont abandonnées
+        res = {name: task.result() if task.done() and not task.cancelled() else [] for name, task in tasks.items()}
+        return self._fuse(res, timings, t_start)
 
-        # 3) dédup + normalisation + tri
-        dedup: Dict[tuple, Tuple[Document, float]] = {}
-        for doc, sc in hits:
+    def _fuse(self, res: Dict[str, Any], timings: Dict[str, float], t_start: float) -> List[Tuple[Document, float]]:
+        def _key(doc: Document) -> tuple:
             meta = doc.metadata or {}
-            key = (meta.get("source"), meta.get("page"), (doc.page_content or "")[:120])
-            if key not in dedup:
-                dedup[key] = (doc, sc)
+            # row_start: les groupes de lignes d'un tableau commencent tous par le même en-tête
+            return (meta.get("source"), meta.get("page"), meta.get("row_start"), (doc.page_content or "")[:120])
 
-        out: List[Tuple[Document, float]] = []
-        for doc, sc in dedup.values():
-            out.append((doc, _normalize_score(sc)))
+        t0 = time.perf_counter()
+        if "bm25" in res:
+            # fusion RRF de la recherche générale et de BM25 (rangs seulement: scores vectoriels et
+            # BM25 incomparables); score renvoyé = RRF / RRF maximal possible, dans [0, 1]
+            runs = [res["general"], res["bm25"]]
+            best = sum(1.0 / (RRF_K + 1) for run in runs if run)
+            fused = rrf_fuse(runs, k=RRF_K, key=lambda d: d.id or _key(d))
+            general = [(doc, sc / best) for doc, sc in fused]
+        else:
+            general = [(doc, _normalize_score(sc)) for doc, sc in res["general"]]
 
-        out.sort(key=lambda x: x[1], reverse=True)
-        return out[: self.top_k]
+        # tables d'abord, puis la recherche générale; doublons exacts retirés et passages voisins
+        # fusionnés avant la coupe à top_k. En hybride, une part des places (1 - HYBRID_TABLE_SHARE)
+        # est réservée à la liste fusionnée: des tableaux nombreux ne l'évincent pas.
+        tables = merge_hits([(doc, _normalize_score(sc)) for doc, sc in res["tables"]])
+        found = {content_hash(doc.page_content) for doc, _ in tables}
+        general = [h for h in merge_hits(general) if content_hash(h[0].page_content) not in found]
+        reserved = min(len(general), math.ceil(self.top_k * (1.0 - HYBRID_TABLE_SHARE))) if "bm25" in res else 0
+        out = tables[: self.top_k - reserved]
+        out += general[: self.top_k - len(out)]
+        timings["fusion_ms"] = _ms(t0)
+        timings["retrieve_ms"] = _ms(t_start)
+        return out
 
     def _format_history(self, history_pairs: List[Tuple[str, str]], max_turns: int = 6) -> str:
         if not history_pairs:
@@ -112,37 +232,274 @@ class RAGPipeline:
                 lines.append(f"Assistant: {a}")
         return "\n".join(lines) if lines else "—"
 
-    def answer(self, question: str, history_pairs: List[Tuple[str, str]] | None = None) -> Dict[str, Any]:
-        hits = self.retrieve(question)
-        if not hits:
-            return {"answer": "Aucun passage pertinent trouvé.", "pages": [], "hits": []}
-
-        def _fmt(doc: Document) -> str:
-            txt = (doc.page_content or "").strip()
-            typ = (doc.metadata or {}).get("type", "text")
-            if typ not in ("table", "table_flat") and len(txt) > 1600:
-                txt = txt[:1600] + " ..."
-            return f"(p. {doc.metadata.get('page')}) {txt}"
-
-        context = "\n\n".join([_fmt(h[0]) for h in hits])
-        pages = sorted({
-            h[0].metadata.get('page')
-            for h in hits
-            if (h[0].metadata or {}).get('page') is not None
-        })
+    def _cache_scope(self) -> str:
+        return f"{corpus_version(MANIFEST_PATH)}|{PROMPT_VERSION}|k={self.top_k}"
+
+    def _history_key(self, history_pairs: List[Tuple[str, str]] | None) -> str:
         hist = self._format_history(history_pairs or [])
+        return "" if hist == "—" else text_hash(hist)
 
-        chain = self._qa_prompt | self.llm | self._parser
-        answer = chain.invoke({"question": question, "context": context, "history": hist})
+    def _kpi_answer(self, question: str, history_pairs: List[Tuple[str, str]] | None = None) -> Dict[str, Any] | None:
+        """Question « KPI exact » résolue depuis l'index des tableaux, sans recherche ni LLM.
 
+        Pas de raccourci en cours de conversation: une relance (« et en 2022 ? ») dépend de l'historique.
+        """
+        if self.tables is None or history_pairs:
+            return None
+        try:
+            kpi = self.tables.lookup(question)
+        except Exception:
+            return None
+        if kpi is None:
+            return None
+        pages = kpi["pages"]
+        cite = f" [p. {', '.join(str(p) for p in pages)}]" if pages else ""
         return {
-            "answer": answer,
+            "answer": f"{kpi['label']} ({kpi['column']}) : {kpi['raw']}{cite}",
             "pages": pages,
+            "hits": [{
+                "page": o["page"],
+                "text": f"{kpi['label']} | {kpi['column']} | {kpi['raw']}",
+                "score": 1.0,
+                "source": o["source"],
+                "type": "table_kpi",
+            } for o in kpi["occurrences"]],
+            "kpi": kpi,
+        }
+
+    def _prompt(self, question: str, history_pairs: List[Tuple[str, str]] | None,
+                hits: List[Tuple[Document, float]]) -> Tuple[Dict[str, str], List[Tuple[Document, float]], Dict[str, Any]]:
+        """Entrées du prompt, passages retenus et bilan de l'assemblage du contexte."""
+        # passages dans l'ordre des scores jusqu'au budget de tokens (dernier raccourci à une phrase)
+        context, hits, packing = pack_context(hits, CONTEXT_TOKEN_BUDGET, OPENAI_MODEL)
+        hist = self._format_history(history_pairs or [])
+        inputs = {"question": question, "context": context, "history": hist}
+        packing["prompt_tokens"] = sum(count_tokens(
+            [m.content for m in self._qa_prompt.format_messages(**inputs)], OPENAI_MODEL
+        ))
+        return inputs, hits, packing
+
+    @staticmethod
+    def _result(answer: str, hits: List[Tuple[Document, float]], packing: Dict[str, Any],
+                compression: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        result = {
+            "answer": answer,
+            "pages": sorted({p for h in hits for p in occurrence_pages(h[0])}),  # + pages des quasi-doublons fusionnés
             "hits": [{
                 "page": h[0].metadata.get("page"),
+                "pages": occurrence_pages(h[0]),
                 "text": h[0].page_content,
                 "score": float(h[1]),
                 "source": h[0].metadata.get("source"),
                 "type": h[0].metadata.get("type"),
-            } for h in hits]
+            } for h in hits],
+            "context": packing,  # budget, tokens, hits, trimmed, dropped, prompt_tokens
         }
+        if compression is not None:
+            result["compression"] = compression  # hits, sentences, kept, chars_in, chars_out
+        return result
+
+    def _compress(self, hits: List[Tuple[Document, float]],
+                  qvec: List[float]) -> Tuple[List[Tuple[Document, float]], Optional[Dict[str, Any]]]:
+        try:
+            return compress_hits(hits, qvec, self.vs.embeddings, COMPRESSION_SENTENCES)
+        except Exception:
+            return hits, None  # compression facultative: passages complets
+
+    def _cache_lookup(self, cache: SemanticAnswerCache, qvec: List[float], scope: str, hist_key: str,
+                      question: str) -> Optional[Dict[str, Any]]:
+        try:
+            return cache.lookup(qvec, scope, hist_key, question)
+        except Exception:
+            return None
+
+    @staticmethod
+    def _cache_store(cache: SemanticAnswerCache, qvec: List[float], scope: str, hist_key: str,
+                     question: str, result: Dict[str, Any]) -> None:
+        try:
+            cache.store(qvec, scope, hist_key, question, result)
+        except Exception:
+            pass  # cache best effort: la réponse est déjà là
+
+    # --- Réponse: préparation (KPI, cache, recherche, contexte) puis génération ---
+    # prep: "result" (réponse finale sans LLM) ou "inputs", "hits", "packing", "compression", "timings", "cache"...
+
+    def _prepare(self, question: str, history_pairs: List[Tuple[str, str]] | None, t_start: float) -> Dict[str, Any]:
+        fast = self._kpi_answer(question, history_pairs)
+        if fast is not None:
+            fast["timings"] = {"kpi_ms": _ms(t_start), "total_ms": _ms(t_start)}
+            return {"result": fast}
+        timings: Dict[str, float] = {}
+        qvec: Optional[List[float]] = None
+        cache = self.cache
+        if cache is not None or CONTEXT_COMPRESSION:
+            t0 = time.perf_counter()
+            qvec = embed_query(self.vs, question)  # réutilisé par le cache, retrieve et la compression
+            timings["embed_ms"] = _ms(t0)
+        scope = hist_key = ""
+        if cache is not None:
+            # question reformulée déjà traitée (même corpus, prompt, top_k et historique)
+            t0 = time.perf_counter()
+            scope, hist_key = self._cache_scope(), self._history_key(history_pairs)
+            cached = self._cache_lookup(cache, qvec, scope, hist_key, question)
+            timings["cache_ms"] = _ms(t0)
+            if cached is not None:
+                timings["total_ms"] = _ms(t_start)
+                cached["timings"] = timings
+                return {"result": cached}
+        hits = self.retrieve(question, timings, qvec=qvec)
+        if not hits:
+            timings["total_ms"] = _ms(t_start)
+            return {"result": {"answer": "Aucun passage pertinent trouvé.", "pages": [], "hits": [], "timings": timings}}
+
+        compression: Optional[Dict[str, Any]] = None
+        if CONTEXT_COMPRESSION:
+            t0 = time.perf_counter()
+            hits, compression = self._compress(hits, qvec)
+            timings["compress_ms"] = _ms(t0)
+        inputs, hits, packing = self._prompt(question, history_pairs, hits)
+        return {"inputs": inputs, "hits": hits, "packing": packing, "compression": compression, "timings": timings,
+                "cache": cache, "qvec": qvec, "scope": scope, "hist_key": hist_key}
+
+    async def _aprepare(self, question: str, history_pairs: List[Tuple[str, str]] | None,
+                        t_start: float) -> Dict[str, Any]:
+        """`_prepare` sans bloquer la boucle: SQLite et compression dans des threads, embedding async."""
+        fast = await asyncio.to_thread(self._kpi_answer, question, history_pairs)
+        if fast is not None:
+            fast["timings"] = {"kpi_ms": _ms(t_start), "total_ms": _ms(t_start)}
+            return {"result": fast}
+        timings: Dict[str, float] = {}
+        qvec: Optional[List[float]] = None
+        cache = self.cache
+        if cache is not None or CONTEXT_COMPRESSION:
+            t0 = time.perf_counter()
+            qvec = await aembed_query(self.vs, question)
+            timings["embed_ms"] = _ms(t0)
+        scope = hist_key = ""
+        if cache is not None:
+            t0 = time.perf_counter()
+            scope, hist_key = self._cache_scope(), self._history_key(history_pairs)
+            cached = await asyncio.to_thread(self._cache_lookup, cache, qvec, scope, hist_key, question)
+            timings["cache_ms"] = _ms(t0)
+            if cached is not None:
+                timings["total_ms"] = _ms(t_start)
+                cached["timings"] = timings
+                return {"result": cached}
+        hits = await self.aretrieve(question, timings, qvec=qvec)
+        if not hits:
+            timings["total_ms"] = _ms(t_start)
+            return {"result": {"answer": "Aucun passage pertinent trouvé.", "pages": [], "hits": [], "timings": timings}}
+
+        compression: Optional[Dict[str, Any]] = None
+        if CONTEXT_COMPRESSION:
+            t0 = time.perf_counter()
+            hits, compression = await asyncio.to_thread(self._compress, hits, qvec)
+            timings["compress_ms"] = _ms(t0)
+        inputs, hits, packing = self._prompt(question, history_pairs, hits)
+        return {"inputs": inputs, "hits": hits, "packing": packing, "compression": compression, "timings": timings,
+                "cache": cache, "qvec": qvec, "scope": scope, "hist_key": hist_key}
+
+    def _sources(self, prep: Dict[str, Any]) -> Dict[str, Any]:
+        """Passages et pages cités, disponibles dès la fin de la recherche (avant la génération)."""
+        result = self._result("", prep["hits"], prep["packing"], prep["compression"])
+        result["timings"] = dict(prep["timings"])
+        return result
+
+    def _finish(self, prep: Dict[str, Any], answer: str, t_start: float) -> Dict[str, Any]:
+        timings = prep["timings"]
+        timings["total_ms"] = _ms(t_start)
+        result = self._result(answer, prep["hits"], prep["packing"], prep["compression"])
+        if prep["cache"] is not None:
+            self._cache_store(prep["cache"], prep["qvec"], prep["scope"], prep["hist_key"], prep["inputs"]["question"], result)
+        result["timings"] = timings  # ms par étape: embed, cache, tables, general, bm25, fusion, retrieve, llm, total
+        return result
+
+    def answer(self, question: str, history_pairs: List[Tuple[str, str]] | None = None) -> Dict[str, Any]:
+        t_start = time.perf_counter()
+        prep = self._prepare(question, history_pairs, t_start)
+        if "result" in prep:
+            return prep["result"]
+        chain = self._qa_prompt | self.llm | self._parser
+        t0 = time.perf_counter()
+        answer = chain.invoke(prep["inputs"])
+        prep["timings"]["llm_ms"] = _ms(t0)
+        return self._finish(prep, answer, t_start)
+
+    def stream(self, question: str, history_pairs: List[Tuple[str, str]] | None = None) -> Iterator[Dict[str, Any]]:
+        """Réponse en flux: {"type": "sources", "result"} dès la fin de la recherche, puis un
+        {"type": "token", "text"} par fragment généré, enfin {"type": "done", "result"} (résultat de `answer`).
+
+        Réponse KPI, cache ou absence de passage: directement "done".
+        """
+        t_start = time.perf_counter()
+        prep = self._prepare(question, history_pairs, t_start)
+        if "result" in prep:
+            yield {"type": "done", "result": prep["result"]}
+            return
+        yield {"type": "sources", "result": self._sources(prep)}
+        chain = self._qa_prompt | self.llm | self._parser
+        parts: List[str] = []
+        t0 = time.perf_counter()
+        for chunk in chain.stream(prep["inputs"]):
+            if not parts:
+                prep["timings"]["first_token_ms"] = _ms(t0)
+            parts.append(chunk)
+            yield {"type": "token", "text": chunk}
+        prep["timings"]["llm_ms"] = _ms(t0)
+        yield {"type": "done", "result": self._finish(prep, "".join(parts), t_start)}
+
+    async def aanswer(self, question: str, history_pairs: List[Tuple[str, str]] | None = None,
+                      timeout: Optional[float] = ANSWER_TIMEOUT_S) -> Dict[str, Any]:
+        """Version asynchrone de `answer` (même résultat): aucun thread bloqué pendant l'appel au LLM.
+
+        `timeout` (s) borne la requête entière: asyncio.TimeoutError au-delà. Annuler la tâche
+        appelante annule aussi les recherches et la requête HTTP au LLM en cours.
+        """
+        return await asyncio.wait_for(self._aanswer(question, history_pairs), timeout)
+
+    async def _aanswer(self, question: str, history_pairs: List[Tuple[str, str]] | None) -> Dict[str, Any]:
+        t_start = time.perf_counter()
+        prep = await self._aprepare(question, history_pairs, t_start)
+        if "result" in prep:
+            return prep["result"]
+        chain = self._qa_prompt | self.llm | self._parser
+        t0 = time.perf_counter()
+        answer = await chain.ainvoke(prep["inputs"])
+        prep["timings"]["llm_ms"] = _ms(t0)
+        return await asyncio.to_thread(self._finish, prep, answer, t_start)
+
+    async def astream(self, question: str, history_pairs: List[Tuple[str, str]] | None = None,
+                      timeout: Optional[float] = ANSWER_TIMEOUT_S) -> AsyncIterator[Dict[str, Any]]:
+        """Version asynchrone de `stream` (mêmes événements, `chain.astream`).
+
+        `timeout` (s) borne la requête entière, génération comprise: asyncio.TimeoutError au-delà.
+        """
+        t_start = time.perf_counter()
+        deadline = None if timeout is None else t_start + timeout
+
+        def _left() -> Optional[float]:
+            return None if deadline is None else max(0.0, deadline - time.perf_counter())
+
+        prep = await asyncio.wait_for(self._aprepare(question, history_pairs, t_start), _left())
+        if "result" in prep:
+            yield {"type": "done", "result": prep["result"]}
+            return
+        yield {"type": "sources", "result": self._sources(prep)}
+        chain = self._qa_prompt | self.llm | self._parser
+        parts: List[str] = []
+        t0 = time.perf_counter()
+        tokens = chain.astream(prep["inputs"]).__aiter__()
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(tokens.__anext__(), _left())
+                except StopAsyncIteration:
+                    break
+                if not parts:
+                    prep["timings"]["first_token_ms"] = _ms(t0)
+                parts.append(chunk)
+                yield {"type": "token", "text": chunk}
+        finally:
+            await tokens.aclose()  # arrêt anticipé (délai, annulation, client parti): requête au LLM fermée
+        prep["timings"]["llm_ms"] = _ms(t0)
+        yield {"type": "done", "result": await asyncio.to_thread(self._finish, prep, "".join(parts), t_start)}
@@ -1,9 +1,25 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fonctions import chroma_search
 from fonctions.embeddings import get_embedding
-from fonctions.config import PERSIST_DIR, COLLECTION_NAME
+from fonctions.config import (
+    PERSIST_DIR, COLLECTION_NAME, VECTOR_BACKEND, VECTOR_DTYPE, VECTOR_QUANTIZATION, VECTOR_RESCORE_FACTOR,
+    VECTOR_TRUNCATE_DIMS,
+)
+from langchain.schema import Document
 from langchain_chroma import Chroma
 
 def get_vectorstore():
     emb = get_embedding()
+    if VECTOR_BACKEND == "numpy":
+        from fonctions.numpy_store import NumpyVectorStore
+        return NumpyVectorStore(
+            emb, PERSIST_DIR / "numpy" / COLLECTION_NAME, dtype=VECTOR_DTYPE,
+            quantization=VECTOR_QUANTIZATION, rescore_factor=VECTOR_RESCORE_FACTOR,
+            truncate_dims=VECTOR_TRUNCATE_DIMS,
+        )
+    if VECTOR_BACKEND != "chroma":
+        raise ValueError(f"VECTOR_BACKEND inconnu: {VECTOR_BACKEND}. Utilisez 'chroma' ou 'numpy'.")
     vs = Chroma(
         collection_name=COLLECTION_NAME,
         persist_directory=str(PERSIST_DIR),
@@ -11,10 +27,32 @@ def get_vectorstore():
     )
     return vs
 
+def embed_query(vs, query: str) -> List[float]:
+    """Un seul appel d'embedding par question, réutilisé par toutes les recherches `*_by_vector`."""
+    return vs.embeddings.embed_query(query)
+
+async def aembed_query(vs, query: str) -> List[float]:
+    """`embed_query` sans bloquer la boucle asyncio (API async native du cache / moteur d'embeddings)."""
+    return await vs.embeddings.aembed_query(query)
+
+def search_by_vector(vs, embedding: Sequence[float], k: int = 8,
+                     filter: Optional[Dict[str, Any]] = None) -> List[Tuple[Document, float]]:
+    """Top-k avec score de pertinence [0, 1] (même échelle que `similarity_search_with_relevance_scores`)."""
+    if isinstance(vs, Chroma):
+        return chroma_search.search(vs, embedding, k, filter)
+    return vs.similarity_search_with_relevance_scores_by_vector(embedding, k=k, filter=filter)
+
+def mmr_search_by_vector(vs, embedding: Sequence[float], k: int = 8, fetch_k: int = 40, lambda_mult: float = 0.1,
+                         filter: Optional[Dict[str, Any]] = None) -> List[Tuple[Document, float]]:
+    """MMR (fonctions/mmr.py) sur fetch_k candidats lus en une requête avec leurs embeddings.
+
+    Scores = pertinence [0, 1] comme `search_by_vector`; rang MMR dans metadata["mmr_rank"].
+    """
+    if isinstance(vs, Chroma):
+        return chroma_search.mmr_search(vs, embedding, k, fetch_k, lambda_mult, filter)
+    return vs.max_marginal_relevance_search_with_score_by_vector(
+        embedding, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult, filter=filter
+    )
+
 def retrieve_docs(vs, query: str, k: int = 8):
-    try:
-        return vs.max_marginal_relevance_search_with_score(
-            query, k=k, fetch_k=max(40, k * 8), lambda_mult=0.1
-        )
-    except Exception:
-        return vs.similarity_search_with_relevance_scores(query, k=k)
+    return mmr_search_by_vector(vs, embed_query(vs, query), k=k, fetch_k=max(40, k * 8), lambda_mult=0.1)
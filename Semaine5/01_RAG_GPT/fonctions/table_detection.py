@@ -0,0 +1,125 @@
+from __future__ import annotations
+import re
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Seuils de la détection (en points PDF)
+_THIN = 2.0            # un rectangle plus fin que ça est un trait
+_MIN_RULE_LEN = 20.0   # longueur minimale d'un trait de tableau
+_ROW_TOL = 3.0         # tolérance verticale pour regrouper une ligne de texte
+_COL_TOL = 6.0         # tolérance horizontale pour aligner des colonnes
+_NUM_RE = re.compile(r"^[\(\-\+\$€%]*\d[\d,\.\s]*[\)%]?[BMK]?$")
+
+
+def _page_features(page) -> Dict[str, float]:
+    """Traits (ruling lines) et grille de caractères d'une page, via la couche texte pypdf.
+
+    Les opérateurs du flux de contenu sont lus directement (sans rendu): `re`/`m`/`l`
+    pour les traits, `Tj`/`TJ` (+ matrice texte) pour la position de chaque cellule.
+    """
+    h_rules = v_rules = 0
+    path_start: List[Tuple[float, float]] = []
+    cells: List[Tuple[float, float, str]] = []
+
+    font_size = [10.0]
+
+    def add_cell(text, dx: float, cm, tm) -> None:
+        t = text.decode("latin-1", "ignore") if isinstance(text, bytes) else str(text)
+        t = t.strip()
+        if t:
+            x = tm[4] + dx
+            cells.append((x * cm[0] + tm[5] * cm[2] + cm[4], x * cm[1] + tm[5] * cm[3] + cm[5], t))
+
+    def before(op, args, cm, tm):
+        nonlocal h_rules, v_rules
+        if op == b"Tf" and len(args) == 2:
+            font_size[0] = float(args[1]) or font_size[0]
+        elif op in (b"Tj", b"'", b'"') and args:
+            add_cell(args[-1], 0.0, cm, tm)
+        elif op == b"TJ" and args:
+            # un TJ peut contenir toute une ligne de tableau: un grand espacement = nouvelle cellule
+            fs = font_size[0] * (abs(tm[0]) or 1.0)
+            buf, start, dx = "", 0.0, 0.0
+            for item in args[0]:
+                if isinstance(item, (int, float)) or hasattr(item, "as_numeric"):
+                    shift = -float(item) / 1000.0 * fs
+                    if shift > fs and buf:
+                        add_cell(buf, start, cm, tm)
+                        buf, start = "", dx + shift
+                    elif not buf:
+                        start = dx + shift
+                    dx += shift
+                else:
+                    text = item.decode("latin-1", "ignore") if isinstance(item, bytes) else str(item)
+                    buf += text
+                    dx += len(text) * fs * 0.5  # largeur moyenne approximative d'un glyphe
+            add_cell(buf, start, cm, tm)
+        elif op == b"re" and len(args) == 4:
+            w, hgt = abs(float(args[2])), abs(float(args[3]))
+            if hgt <= _THIN and w >= _MIN_RULE_LEN:
+                h_rules += 1
+            elif w <= _THIN and hgt >= _MIN_RULE_LEN:
+                v_rules += 1
+        elif op == b"m" and len(args) == 2:
+            path_start[:] = [(float(args[0]), float(args[1]))]
+        elif op == b"l" and len(args) == 2 and path_start:
+            x0, y0 = path_start[0]
+            x1, y1 = float(args[0]), float(args[1])
+            if abs(y1 - y0) <= _THIN and abs(x1 - x0) >= _MIN_RULE_LEN:
+                h_rules += 1
+            elif abs(x1 - x0) <= _THIN and abs(y1 - y0) >= _MIN_RULE_LEN:
+                v_rules += 1
+            path_start[:] = [(x1, y1)]
+
+    page.extract_text(visitor_operand_before=before)
+
+    # grille: lignes de texte (même y) ayant plusieurs cellules alignées sur des colonnes récurrentes
+    rows: Dict[int, List[Tuple[float, str]]] = defaultdict(list)
+    for x, y, t in cells:
+        rows[int(round(y / _ROW_TOL))].append((x, t))
+    multi = [r for r in rows.values() if len(r) >= 3]
+    col_hits = Counter(int(round(x / _COL_TOL)) for r in multi for x, _ in r)
+    # une colonne = position x récurrente sur une bonne part des lignes (écarte le texte justifié)
+    columns = {c for c, n in col_hits.items() if n >= max(3, 0.3 * len(multi))}
+    grid_rows = sum(1 for r in multi if sum(1 for x, _ in r if int(round(x / _COL_TOL)) in columns) >= 3)
+    numeric = sum(1 for r in multi for _, t in r if _NUM_RE.match(t))
+    n_cells = sum(len(r) for r in multi)
+    return {
+        "h_rules": h_rules,
+        "v_rules": v_rules,
+        "grid_rows": grid_rows,
+        "columns": len(columns),
+        "numeric_ratio": numeric / n_cells if n_cells else 0.0,
+    }
+
+
+def _classify(f: Dict[str, float]) -> Optional[str]:
+    """Renvoie la saveur Camelot à essayer d'abord, ou None si la page n'a pas l'air d'un tableau."""
+    if f["h_rules"] >= 3 and f["v_rules"] >= 2:
+        return "lattice"   # grille dessinée
+    if f["grid_rows"] >= 4 and f["columns"] >= 3 and f["numeric_ratio"] >= 0.2:
+        return "stream"    # colonnes de chiffres alignées sans traits
+    if f["h_rules"] >= 3 and f["grid_rows"] >= 2 and f["numeric_ratio"] >= 0.3:
+        return "stream"    # tableau financier à filets horizontaux seulement
+    return None
+
+
+def detect_table_pages(pdf_path: Path, pages: Optional[Tuple[int, int]] = None) -> Dict[int, str]:
+    """Pages candidates (numéros 1-based, comme Camelot) -> saveur Camelot préférée.
+
+    Passe rapide sur la couche texte (traits + densité de grille), sans rendu.
+    `pages` = plage [début, fin) 0-based, None = tout le PDF.
+    """
+    from pypdf import PdfReader
+    reader = PdfReader(str(pdf_path))
+    start, end = pages if pages is not None else (0, len(reader.pages))
+    out: Dict[int, str] = {}
+    for i in range(start, min(end, len(reader.pages))):
+        try:
+            flavor = _classify(_page_features(reader.pages[i]))
+        except Exception:
+            flavor = "lattice"  # page illisible pour la passe rapide: on laisse Camelot trancher
+        if flavor:
+            out[i + 1] = flavor
+    return out
@@ -0,0 +1,178 @@
+from __future__ import annotations
+import re
+import sqlite3
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Index SQLite des cellules de tableaux: (source, page, libellé de ligne, en-tête de colonne, valeur).
+# Sert de raccourci aux questions « KPI exact » (ex. "Total revenues au T1 2023") sans LLM.
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_QUARTER = re.compile(r"\b(?:q|t)\s*([1-4])\s*(?:fy)?\s*((?:19|20)?\d{2})\b|\b([1-4])\s*q\s*((?:19|20)?\d{2})\b")
+_YEAR = re.compile(r"\b(?:fy\s*)?((?:19|20)\d{2})\b")
+_NUMERIC = re.compile(r"^\(?-?[$€£]?\s*\d[\d\s.,]*\s*%?\)?$")
+_PERIOD_TOKEN = re.compile(r"^(?:q|t|fy|h|s)?\d+$|^\dq\d+$")
+# mots tolérés dans une question "KPI exact" en plus du libellé et de la période
+_FILLER = set("""
+quel quelle quels quelles est sont etait etaient a ete le la les l un une de du des d au aux en
+pour sur dans par et ou valeur montant combien chiffre niveau donne donner moi trimestre annee exercice
+what was were is are the of in for and value amount how much give me quarter year fiscal
+""".split())
+
+def normalize(text: str) -> str:
+    """minuscules, sans accents ni ponctuation, espaces simples."""
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode("ascii")
+    return _NON_ALNUM.sub(" ", text.lower()).strip()
+
+def _year(y: str) -> str:
+    return y if len(y) == 4 else f"20{y}"
+
+def periods(text: str) -> List[str]:
+    """Périodes citées: "T1 2023", "Q1-23", "1Q23" -> "q1 2023"; année seule -> "2023"."""
+    t = normalize(text)
+    out = []
+    for m in _QUARTER.finditer(t):
+        q, y = (m.group(1), m.group(2)) if m.group(1) else (m.group(3), m.group(4))
+        out.append(f"q{q} {_year(y)}")
+    if not out:
+        out = [m.group(1) for m in _YEAR.finditer(t)]
+    return list(dict.fromkeys(out))
+
+def figures(text: str) -> List[str]:
+    """Périodes puis autres nombres cités, triés: "Q1-23 et 19,3 %" -> ["q1 2023", "19", "3"]."""
+    t = normalize(text)
+    rest = _YEAR.sub(" ", _QUARTER.sub(" ", t))
+    return sorted(periods(t)) + sorted({tok for tok in rest.split() if any(c.isdigit() for c in tok)})
+
+def to_number(raw: str) -> Optional[float]:
+    """'23,329' -> 23329 ; '(1,234)' -> -1234 ; '19.3%' -> 19.3 ; '1 234,5' -> 1234.5 ;
+    '1.234,5' -> 1234.5 ; '1,234.5' -> 1234.5 ; sinon None."""
+    s = (raw or "").strip()
+    if not s or not _NUMERIC.match(s):
+        return None
+    neg = s.startswith("(") and s.endswith(")") or "-" in s
+    s = re.sub(r"[^\d.,]", "", s)
+    if "," in s and "." in s:
+        # le séparateur le plus à droite est la décimale, l'autre sépare les milliers
+        dec, thousands = (",", ".") if s.rfind(",") > s.rfind(".") else (".", ",")
+        s = s.replace(thousands, "").replace(dec, ".")
+    elif "," in s:
+        s = s.replace(",", "") if re.fullmatch(r"\d{1,3}(,\d{3})+", s) else s.replace(",", ".")
+    try:
+        v = float(s)
+    except ValueError:
+        return None
+    return -v if neg else v
+
+class TableStore:
+    """Cellules des tableaux extraits, indexées par libellé normalisé et par (source, page)."""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cells ("
+            " source TEXT NOT NULL, page INTEGER, table_id TEXT NOT NULL,"
+            " row_label TEXT NOT NULL, row_norm TEXT NOT NULL,"
+            " col_header TEXT NOT NULL, col_period TEXT NOT NULL,"
+            " raw TEXT NOT NULL, value REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_cells_row ON cells(row_norm)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_cells_src ON cells(source, page)")
+        self._db.commit()
+        self._labels: Dict[str, Tuple[str, ...]] = {}
+        self._version: Optional[int] = None
+
+    # --- écriture (ingestion) ---
+
+    def delete_source(self, source: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM cells WHERE source=?", (source,))
+
+    def add_table(self, source: str, page: Any, table_id: str, rows: List[List[str]]) -> int:
+        """Première ligne = en-tête; libellé de ligne = première cellule non numérique."""
+        if len(rows) < 2:
+            return 0
+        try:
+            page = int(page)
+        except (TypeError, ValueError):
+            page = None
+        header = [(c or "").strip() for c in rows[0]]
+        cells = []
+        for row in rows[1:]:
+            label = next((c.strip() for c in row if c.strip() and to_number(c) is None), "")
+            if not normalize(label):
+                continue
+            for j, raw in enumerate(row):
+                value = to_number(raw)
+                if value is None or j >= len(header):
+                    continue
+                col_period = " ".join(periods(header[j])[:1])
+                cells.append((source, page, table_id, label, normalize(label),
+                              header[j], col_period, raw.strip(), value))
+        with self._lock:
+            self._db.executemany("INSERT INTO cells VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", cells)
+        return len(cells)
+
+    def commit(self) -> None:
+        with self._lock:
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    # --- lecture (RAGPipeline) ---
+
+    def _row_labels(self) -> Dict[str, Tuple[str, ...]]:
+        (version,) = self._db.execute("PRAGMA data_version").fetchone()
+        if version != self._version:  # l'ingestion (autre connexion) a modifié la base
+            rows = self._db.execute("SELECT DISTINCT row_norm FROM cells").fetchall()
+            self._labels = {r: tuple(r.split()) for (r,) in rows}
+            self._version = version
+        return self._labels
+
+    def lookup(self, question: str) -> Optional[Dict[str, Any]]:
+        """Réponse directe si la question désigne une seule valeur sans ambiguïté, sinon None.
+
+        Ligne = libellé dont les mots sont exactement ceux de la question (hors mots outils et
+        période); colonne = période citée (ou unique colonne chiffrée).
+        Valeurs divergentes entre pages ou tableaux -> None (repli sur le RAG).
+        """
+        words = set(normalize(question).split())
+        content = {w for w in words if w not in _FILLER and not _PERIOD_TOKEN.match(w)}
+        wanted = periods(question)
+        with self._lock:
+            labels = self._row_labels()
+            matches = [r for r, toks in labels.items() if toks and set(toks) <= words and not r.isdigit()]
+            if not matches:
+                return None
+            # tous les mots porteurs de sens de la question doivent être dans le libellé:
+            # "total" seul ne répond pas à "total revenues"
+            rows = [r for r in matches if content <= set(labels[r])]
+            if not rows:
+                return None
+            cells = self._db.execute(
+                "SELECT source, page, row_label, col_header, col_period, raw, value FROM cells"
+                f" WHERE row_norm IN ({','.join('?' * len(rows))})", rows,
+            ).fetchall()
+        if wanted:
+            cells = [c for c in cells if c[4] and c[4] in wanted]
+        elif len({c[3] for c in cells}) > 1:
+            return None  # plusieurs colonnes et aucune période demandée
+        if not cells or len({c[6] for c in cells}) != 1:
+            return None
+        source, _, label, col, _, raw, value = cells[0]
+        return {
+            "label": label,
+            "column": col,
+            "raw": raw,
+            "value": value,
+            "source": source,
+            "pages": sorted({c[1] for c in cells if c[1] is not None}),
+            "occurrences": [{"source": c[0], "page": c[1]} for c in cells],
+        }
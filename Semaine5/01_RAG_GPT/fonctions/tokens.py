@@ -0,0 +1,76 @@
+from __future__ import annotations
+import os
+import re
+from functools import lru_cache
+from typing import List
+
+import numpy as np
+
+_FALLBACK_TOKEN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+@lru_cache(maxsize=8)
+def get_encoding(model: str):
+    """Tokenizer tiktoken du modèle, ou None si indisponible (hors-ligne, modèle inconnu)."""
+    try:
+        import tiktoken
+    except Exception:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        try:
+            return tiktoken.get_encoding("o200k_base")
+        except Exception:
+            return None
+    except Exception:
+        return None
+
+
+def _encode(enc, texts: List[str]) -> List[List[int]]:
+    # encode_ordinary_batch répartit sur plusieurs threads (sans GIL) mais crée un pool à
+    # chaque appel: rentable seulement pour de gros lots sur une machine multi-cœurs
+    if len(texts) >= 256 and (os.cpu_count() or 1) > 1:
+        return enc.encode_ordinary_batch(texts, num_threads=os.cpu_count())
+    return [enc.encode_ordinary(t) for t in texts]
+
+
+def count_tokens(texts: List[str], model: str) -> List[int]:
+    """Nombre de tokens par texte (estimation mots + ponctuation si tiktoken indisponible)."""
+    enc = get_encoding(model)
+    if enc is not None:
+        return [len(ids) for ids in _encode(enc, texts)]
+    return [len(_FALLBACK_TOKEN.findall(t)) for t in texts]
+
+
+@lru_cache(maxsize=8)
+def _token_bytes(model: str) -> np.ndarray:
+    """Longueur en octets de chaque token du vocabulaire, indexée par id."""
+    enc = get_encoding(model)
+    lens = np.zeros(enc.max_token_value + 1, dtype=np.int64)
+    for i in range(len(lens)):
+        try:
+            lens[i] = len(enc.decode_single_token_bytes(i))
+        except KeyError:
+            pass  # trou dans le vocabulaire
+    return lens
+
+
+def token_ends(texts: List[str], model: str) -> List[np.ndarray]:
+    """Fin (position en caractères) de chaque token, texte par texte: une seule tokenisation par texte.
+
+    Les positions viennent des longueurs en octets des tokens (cumulées), ramenées en caractères
+    en retirant les octets de continuation UTF-8. Repli sans tiktoken: fins des mots et ponctuations.
+    """
+    enc = get_encoding(model)
+    if enc is None:
+        return [np.fromiter((m.end() for m in _FALLBACK_TOKEN.finditer(t)), dtype=np.int64) for t in texts]
+    lens = _token_bytes(model)
+    out = []
+    for text, ids in zip(texts, _encode(enc, texts)):
+        ends = np.cumsum(lens[np.asarray(ids, dtype=np.int64)])
+        if len(ends) and not text.isascii():
+            raw = np.frombuffer(text.encode("utf-8"), dtype=np.uint8)
+            ends = ends - np.cumsum((raw & 0xC0) == 0x80)[ends - 1]
+        out.append(ends)
+    return out
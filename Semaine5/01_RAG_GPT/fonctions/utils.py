@@ -1,5 +1,5 @@
 import re
-from langchain.schema import Document
+from typing import Any, Dict
 
 def clean_text(txt: str) -> str:
     txt = re.sub(r"\s+\n", "\n", txt)
@@ -20,3 +20,35 @@ def table_to_markdown_and_flat(table):
     md = "\n".join(md)
     flat = " | ".join([c for row in rows for c in row if c])
     return md, flat
+
+def match_filter(meta: Dict[str, Any], flt: Dict[str, Any]) -> bool:
+    """Sous-ensemble des filtres Chroma: égalité, $eq $ne $in $nin $gt $gte $lt $lte, $and $or."""
+    for key, cond in flt.items():
+        if key == "$and":
+            if not all(match_filter(meta, f) for f in cond):
+                return False
+            continue
+        if key == "$or":
+            if not any(match_filter(meta, f) for f in cond):
+                return False
+            continue
+        value = meta.get(key)
+        if not isinstance(cond, dict):
+            cond = {"$eq": cond}
+        for op, ref in cond.items():
+            if op == "$eq" and value != ref:
+                return False
+            if op == "$ne" and value == ref:
+                return False
+            if op == "$in" and value not in ref:
+                return False
+            if op == "$nin" and value in ref:
+                return False
+            if op in ("$gt", "$gte", "$lt", "$lte"):
+                if value is None:
+                    return False
+                if op == "$gt" and not value > ref or op == "$gte" and not value >= ref:
+                    return False
+                if op == "$lt" and not value < ref or op == "$lte" and not value <= ref:
+                    return False
+    return True